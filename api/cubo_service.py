@@ -0,0 +1,233 @@
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from api.ranking_service import _file_signature
+from etl.transform.cubo import CUBO_COLUMNS, CUBO_DTYPES, CUBO_PATH, contas_por_descricao, cubo_file, load_cubo
+
+Periodo = Tuple[int, int]
+
+
+def _intervalos(*colunas: np.ndarray) -> List[Tuple[Tuple[Any, ...], int, int]]:
+    """Intervalos [início, fim) de linhas consecutivas com a mesma combinação de valores."""
+    n = len(colunas[0])
+    if n == 0:
+        return []
+    muda = np.zeros(n, dtype=bool)
+    muda[0] = True
+    for c in colunas:
+        muda[1:] |= c[1:] != c[:-1]
+    inicios = np.flatnonzero(muda)
+    fins = np.append(inicios[1:], n)
+    return [(tuple(c[i].item() for c in colunas), int(i), int(f)) for i, f in zip(inicios, fins)]
+
+
+def janela(ano: int, trimestre: int, window: int) -> List[Periodo]:
+    """Os `window` trimestres de calendário que terminam em (ano, trimestre), do mais recente."""
+    fim = ano * 4 + trimestre - 1
+    return [(i // 4, i % 4 + 1) for i in range(fim, fim - window, -1)]
+
+
+def _cubo_vazio() -> pd.DataFrame:
+    return pd.DataFrame(columns=CUBO_COLUMNS).astype(CUBO_DTYPES)
+
+
+class CuboService:
+    """Consultas analíticas sobre o cubo trimestral pré-agregado, mantido em memória.
+
+    O cubo está ordenado por (ano, trimestre, conta, operadora); ao carregar são
+    indexados os intervalos de linhas de cada período e de cada conta dentro do
+    período, e os totais por conta. Cada consulta fatia só as linhas que precisa.
+    Como no ranking, o arquivo é recarregado apenas quando o mtime/tamanho muda.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else CUBO_PATH
+        self._cubo = _cubo_vazio()
+        self._periodos: Dict[Periodo, Tuple[int, int]] = {}
+        self._contas: Dict[Tuple[int, int, str], Tuple[int, int]] = {}
+        self._totais = pd.DataFrame()
+        self._totais_periodo: Dict[Periodo, Tuple[int, int]] = {}
+        self._index(self._cubo)
+        self._signature: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+        # Incrementada a cada rebuild; invalida respostas em cache
+        self.version = 0
+
+    def _source_signature(self) -> Optional[Tuple[int, int]]:
+        source = cubo_file(self.path)
+        return _file_signature(source) if source is not None else None
+
+    def _index(self, cubo: pd.DataFrame) -> None:
+        ano = cubo["ano"].to_numpy()
+        tri = cubo["trimestre"].to_numpy()
+        conta = cubo["cd_conta_contabil"].cat.codes.to_numpy()
+        nomes = cubo["cd_conta_contabil"].cat.categories
+
+        periodos = {k: (i, f) for k, i, f in _intervalos(ano, tri)}
+        contas = {(a, t, nomes[c]): (i, f) for (a, t, c), i, f in _intervalos(ano, tri, conta)}
+
+        # Totais por (período, conta): soma sobre as operadoras, na mesma ordem do cubo
+        totais = (
+            cubo.groupby(["ano", "trimestre", "cd_conta_contabil"], observed=True, sort=True)
+            .agg(
+                descricao_conta=("descricao_conta", "first"),
+                operadoras=("reg_ans", "size"),
+                vl_acumulado=("vl_acumulado", "sum"),
+                valor_real=("valor_real", "sum"),
+                lacunas=("lacuna", "sum"),
+            )
+            .reset_index()
+        )
+        totais_periodo = {
+            k: (i, f) for k, i, f in _intervalos(totais["ano"].to_numpy(), totais["trimestre"].to_numpy())
+        }
+
+        self._cubo, self._periodos, self._contas = cubo, periodos, contas
+        self._totais, self._totais_periodo = totais, totais_periodo
+        # Arrays usados pelo top-N: código da operadora e valores, alinhados às linhas do cubo
+        self._reg_codes = cubo["reg_ans"].cat.codes.to_numpy()
+        self._reg_nomes = cubo["reg_ans"].cat.categories
+        self._valores = {c: cubo[c].to_numpy() for c in ("valor_real", "vl_acumulado")}
+        # Índice por operadora: permutação das linhas ordenada por (operadora, conta, ano,
+        # trimestre) e o intervalo [início, fim) de cada operadora nela
+        contas_codes = cubo["cd_conta_contabil"].cat.codes.to_numpy()
+        self._por_operadora = np.lexsort((tri, ano, contas_codes, self._reg_codes))
+        self._limites_operadora = np.searchsorted(
+            self._reg_codes[self._por_operadora], np.arange(len(self._reg_nomes) + 1)
+        )
+        self._conta_codes, self._conta_nomes = contas_codes, nomes
+        # Descrições por código; o código -1 (sem descrição) cai no None do final
+        self._descricao_codes = cubo["descricao_conta"].cat.codes.to_numpy()
+        self._descricao_nomes = cubo["descricao_conta"].cat.categories.astype(object).append(pd.Index([None]))
+        descricoes = totais.drop_duplicates("cd_conta_contabil").set_index("cd_conta_contabil")["descricao_conta"]
+        self._contas_padrao = contas_por_descricao(descricoes)
+
+    def refresh(self) -> bool:
+        """Recarrega o cubo se o arquivo mudou. Retorna True se houve rebuild."""
+        signature = self._source_signature()
+        if signature == self._signature:
+            return False
+
+        with self._lock:
+            signature = self._source_signature()
+            if signature == self._signature:
+                return False
+
+            try:
+                cubo = load_cubo(self.path) if signature is not None else None
+            except Exception as e:
+                print(f"Erro ao carregar o cubo trimestral: {e}")
+                cubo = None
+            if cubo is None:
+                print(f"Cubo trimestral indisponível: {self.path}")
+                cubo = _cubo_vazio()
+
+            self._index(cubo)
+            self._signature = signature
+            self.version += 1
+            return True
+
+    def periodos(self) -> List[Periodo]:
+        """Períodos presentes, do mais recente para o mais antigo."""
+        return sorted(self._periodos, reverse=True)
+
+    def contas(self, ano: int, trimestre: int) -> List[Dict[str, Any]]:
+        """Totais de cada conta no período (soma sobre todas as operadoras)."""
+        inicio, fim = self._totais_periodo.get((ano, trimestre), (0, 0))
+        rows = self._totais.iloc[inicio:fim].drop(columns=["ano", "trimestre"])
+        rows = rows.astype({"cd_conta_contabil": str}).astype(object)
+        # Ausentes (ex.: conta sem descrição) viram None: o JSON sai igual com ou sem orjson
+        return rows.where(rows.notna(), None).to_dict(orient="records")
+
+    def contas_padrao(self) -> List[str]:
+        """Contas de eventos/sinistros médico-hospitalares, as do ranking padrão."""
+        return list(self._contas_padrao)
+
+    def top(
+        self,
+        n: int,
+        ano: int,
+        trimestre: int,
+        contas: Union[str, Sequence[str]],
+        window: int = 1,
+        acumulado: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """As `n` operadoras de maior valor nas `contas`, somado nos `window` trimestres até o período.
+
+        Com `acumulado=True` usa o saldo acumulado no ano (só com window=1). Valores de
+        trimestres com lacuna (NaN) não entram na soma; empates seguem o código da operadora.
+        """
+        if isinstance(contas, str):
+            contas = [contas]
+        if acumulado and window != 1:
+            raise ValueError("O saldo acumulado não é somado em janelas; use window=1")
+
+        # Cada (período, conta) é um intervalo contíguo do cubo
+        fatias = [
+            self._contas[(a, t, c)]
+            for a, t in janela(ano, trimestre, window)
+            for c in dict.fromkeys(contas)
+            if (a, t, c) in self._contas
+        ]
+        if not fatias:
+            return []
+        linhas = np.concatenate([np.arange(i, f) for i, f in fatias])
+        regs = self._reg_codes[linhas]
+        valores = self._valores["vl_acumulado" if acumulado else "valor_real"][linhas]
+        ok = ~np.isnan(valores)
+
+        # Soma por operadora com bincount sobre os códigos da categoria
+        n_regs = len(self._reg_nomes)
+        total = np.bincount(regs[ok], weights=valores[ok], minlength=n_regs)
+        candidatos = np.flatnonzero(np.bincount(regs[ok], minlength=n_regs))
+        if len(candidatos) > n:
+            corte = np.partition(-total[candidatos], n - 1)[n - 1]
+            candidatos = candidatos[-total[candidatos] <= corte]
+        ordem = candidatos[np.lexsort((candidatos, -total[candidatos]))][:n]
+        return [{"reg_ans": self._reg_nomes[c], "valor": float(total[c])} for c in ordem]
+
+    def tem_operadora(self, reg_ans: str) -> bool:
+        return self._reg_nomes.get_indexer([str(reg_ans).strip().zfill(6)])[0] >= 0
+
+    def serie(
+        self, reg_ans: str, contas: Optional[Union[str, Sequence[str]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Série trimestral de uma operadora, em todas as contas ou só nas `contas`.
+
+        Usa o intervalo da operadora no índice ordenado: o custo depende só do número de
+        linhas dela, não do tamanho do cubo.
+        """
+        codigo = self._reg_nomes.get_indexer([str(reg_ans).strip().zfill(6)])[0]
+        if codigo < 0:
+            return []
+        linhas = self._por_operadora[self._limites_operadora[codigo]:self._limites_operadora[codigo + 1]]
+        if contas is not None:
+            if isinstance(contas, str):
+                contas = [contas]
+            codigos = self._conta_nomes.get_indexer(list(contas))
+            linhas = linhas[np.isin(self._conta_codes[linhas], codigos[codigos >= 0])]
+
+        # Monta os registros direto dos arrays (sem DataFrame intermediário por consulta)
+        cubo = self._cubo
+        colunas = {
+            "ano": cubo["ano"].to_numpy()[linhas].tolist(),
+            "trimestre": cubo["trimestre"].to_numpy()[linhas].tolist(),
+            "cd_conta_contabil": self._conta_nomes.take(self._conta_codes[linhas]).tolist(),
+            "descricao_conta": self._descricao_nomes.take(self._descricao_codes[linhas]).tolist(),
+            "vl_acumulado": [None if v != v else v for v in self._valores["vl_acumulado"][linhas].tolist()],
+            "valor_real": [None if v != v else v for v in self._valores["valor_real"][linhas].tolist()],
+            "lacuna": cubo["lacuna"].to_numpy()[linhas].tolist(),
+        }
+        return [dict(zip(colunas, valores)) for valores in zip(*colunas.values())]
+
+
+def build_cubo_from_env() -> CuboService:
+    path = os.getenv("ANS_CUBO_PATH")
+    service = CuboService(path=path)
+    service.refresh()
+    return service
@@ -1,11 +1,14 @@
 import os
-import pandas as pd
+import secrets
 from typing import Optional
-from pathlib import Path
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
-from api.search_service import build_service_from_env
+from api.response_cache import build_response_cache_from_env, dumps
+from api.search_service import _normalize_text, build_service_from_env
+from api.ranking_service import build_ranking_from_env
+from api.cubo_service import build_cubo_from_env, janela
 
 app = FastAPI(title="ANS Search API", version="0.1.0")
 
@@ -21,70 +24,180 @@ app.add_middleware(
 )
 
 _service = None
+_ranking = None
+_cache = None
+_cubo = None
 
 @app.on_event("startup")
 def _startup() -> None:
-    global _service
+    global _service, _ranking, _cache, _cubo
     _service = build_service_from_env()
+    _ranking = build_ranking_from_env()
+    _cubo = build_cubo_from_env()
+    _cache = build_response_cache_from_env()
+
+@app.on_event("shutdown")
+def _shutdown() -> None:
+    if _service is not None:
+        _service.stop_watcher()
+
+def _json(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
 
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
 
 @app.get("/search")
-def search(
+async def search(
     query: str = Query(min_length=1),
     limit: int = Query(default=50, ge=1, le=200),
+    fuzzy: bool = Query(default=False),
 ):
-    results = _service.search(query=query, limit=limit)
-    return {"query": query, "count": len(results), "results": results}
+    # O resultado depende só da consulta normalizada; a consulta original é ecoada na resposta.
+    # Chave e busca usam o mesmo índice mesmo que uma recarga o troque no meio da requisição
+    index = _service.index
+    key = ("search", index.version, _normalize_text(query), limit, fuzzy)
+    fragment = _cache.get(key)
+    if fragment is None:
+        # Score fora do event loop; no acerto do cache não há score nem serialização
+        run = index.search_fuzzy if fuzzy else index.search
+        results = await run_in_threadpool(run, query, limit)
+        fragment = b'"count":%d,"results":%s' % (len(results), dumps(results))
+        _cache.put(key, fragment)
+    return _json(b'{"query":' + dumps(query) + b"," + fragment + b"}")
 
-@app.get("/analytics/top-10")
-def get_top_10():
-    # Define o caminho de forma robusta
-    base_dir = Path(__file__).resolve().parent.parent
-    path = base_dir / "etl" / "data" / "interim" / "demo_consolidado_normalized.csv"
-    
-    if not path.exists():
-        print(f"Arquivo não encontrado: {path}")
-        return []
+@app.get("/search/suggest")
+async def suggest(
+    query: str = Query(min_length=1),
+    limit: int = Query(default=10, ge=1, le=50),
+):
+    # Autocomplete por prefixo (bisect em arrays ordenados): barato o bastante para o event loop
+    index = _service.index
+    key = ("suggest", index.version, _normalize_text(query), limit)
+    fragment = _cache.get(key)
+    if fragment is None:
+        results = index.suggest(query, limit)
+        fragment = b'"count":%d,"results":%s' % (len(results), dumps(results))
+        _cache.put(key, fragment)
+    return _json(b'{"query":' + dumps(query) + b"," + fragment + b"}")
 
+@app.get("/search/index")
+async def search_index():
+    # Versão e tempo de carga do índice em uso
+    return _service.info()
+
+@app.post("/admin/reload-index")
+async def reload_index(x_admin_token: Optional[str] = Header(default=None)):
+    # Desativada sem ADMIN_TOKEN; com ele, a recarga exige o cabeçalho X-Admin-Token
+    token = os.getenv("ADMIN_TOKEN")
+    if not token:
+        raise HTTPException(status_code=403, detail="Recarga desativada: ADMIN_TOKEN não configurado")
+    if not secrets.compare_digest(x_admin_token or "", token):
+        raise HTTPException(status_code=403, detail="Token inválido")
+    # O índice novo é montado fora do event loop; as buscas seguem no anterior até a troca
     try:
-        # Leitura blindada
-        df = pd.read_csv(path, sep=None, engine='python', encoding='utf-8-sig', on_bad_lines='skip', quoting=3)
-        
-        # Normalização das colunas
-        df.columns = [str(c).strip().upper() for c in df.columns]
-        
-        # Busca segura de colunas para evitar "index out of range"
-        def find_col(keywords):
-            for kw in keywords:
-                match = [c for c in df.columns if kw in c]
-                if match: return match[0]
-            return None
-
-        # Atualize estas linhas dentro de get_top_10:
-        c_ans = find_col(['REG_ANS', 'REGISTRO'])
-        c_razao = find_col(['RAZAO', 'NOME', 'SOCIAL', 'DESCRICAO_NORM']) 
-        c_valor = find_col(['VL_SALDO_FINAL_NUM', 'VALOR_REAL', 'SALDO'])
-
-        if not all([c_ans, c_razao, c_valor]):
-            print(f"Colunas ausentes no CSV. Encontradas: {list(df.columns)}")
-            return []
-
-        # Garante que o valor é numérico
-        df[c_valor] = pd.to_numeric(df[c_valor], errors='coerce').fillna(0)
-
-        # Agrupamento e Ranking
-        top_10 = df.groupby(c_ans).agg({
-            c_razao: 'first',
-            c_valor: 'sum'
-        }).sort_values(c_valor, ascending=False).head(10).reset_index()
-        
-        # Padronização para o Frontend Vue
-        top_10.columns = ['reg_ans', 'Razao Social', 'valor_real']
-        return top_10.to_dict(orient="records")
-
-    except Exception as e:
-        print(f"Erro no processamento do Ranking: {e}")
-        return []
\ No newline at end of file
+        swapped = await run_in_threadpool(_service.load)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if not swapped:
+        raise HTTPException(status_code=500, detail="Falha ao recarregar o índice; o anterior continua em uso")
+    return _service.info()
+
+@app.get("/analytics/top-10")
+async def get_top_10():
+    # Ranking pré-agregado em memória; só é reconstruído (fora do event loop) se o CSV mudar.
+    # A versão da chave é lida depois da recarga e `top` apenas fatia o ranking carregado
+    await run_in_threadpool(_ranking.refresh)
+    return _json(_cache.get_or_build(("top", _ranking.version, 10), lambda: _ranking.top(10)))
+
+@app.get("/analytics/periodos")
+async def get_periodos():
+    await run_in_threadpool(_cubo.refresh)
+    return _json(_cache.get_or_build(
+        ("periodos", _cubo.version),
+        lambda: [{"ano": a, "trimestre": t} for a, t in _cubo.periodos()],
+    ))
+
+@app.get("/analytics/contas")
+async def get_contas(
+    ano: Optional[int] = Query(default=None),
+    trimestre: Optional[int] = Query(default=None, ge=1, le=4),
+):
+    # Totais de todas as contas no período (padrão: o mais recente), direto do cubo trimestral
+    await run_in_threadpool(_cubo.refresh)
+    periodos = _cubo.periodos()
+    if ano is None or trimestre is None:
+        if not periodos:
+            raise HTTPException(status_code=404, detail="Cubo trimestral indisponível")
+        ano, trimestre = periodos[0]
+    return _json(_cache.get_or_build(
+        ("contas", _cubo.version, ano, trimestre),
+        lambda: {"ano": ano, "trimestre": trimestre, "contas": _cubo.contas(ano, trimestre)},
+    ))
+
+@app.get("/analytics/top-n")
+async def get_top_n(
+    n: int = Query(default=10, ge=1, le=200),
+    ano: Optional[int] = Query(default=None),
+    trimestre: Optional[int] = Query(default=None, ge=1, le=4),
+    conta: Optional[str] = Query(default=None),
+    window: int = Query(default=4, ge=1, le=20),
+):
+    # Ranking por conta e período somando `window` trimestres (padrão: os 4 últimos, janela
+    # móvel de um ano), servido do cubo em memória.
+    # Sem período usa o mais recente; sem conta, as de eventos/sinistros médico-hospitalares
+    await run_in_threadpool(_cubo.refresh)
+    if ano is None or trimestre is None:
+        periodos = _cubo.periodos()
+        if not periodos:
+            raise HTTPException(status_code=404, detail="Cubo trimestral indisponível")
+        ano, trimestre = periodos[0]
+    contas = [conta.strip()] if conta else _cubo.contas_padrao()
+    index = _service.index
+
+    def build():
+        results = [
+            {
+                "reg_ans": r["reg_ans"],
+                "razao_social": (index.operadora(r["reg_ans"]) or {}).get("razao_social"),
+                "valor_real": r["valor"],
+            }
+            for r in _cubo.top(n, ano, trimestre, contas, window=window)
+        ]
+        return {
+            "ano": ano,
+            "trimestre": trimestre,
+            "contas": contas,
+            "window": window,
+            "periodos": [{"ano": a, "trimestre": t} for a, t in janela(ano, trimestre, window)],
+            "count": len(results),
+            "results": results,
+        }
+
+    key = ("top-n", _cubo.version, index.version, n, ano, trimestre, tuple(contas), window)
+    return _json(_cache.get_or_build(key, build))
+
+@app.get("/operadoras/{registro_ans}/series")
+async def get_series(registro_ans: str, conta: Optional[str] = Query(default=None)):
+    # Histórico trimestral da operadora (valor do trimestre e acumulado), com o cadastro do CADOP.
+    # Sem conta, as de eventos/sinistros médico-hospitalares
+    await run_in_threadpool(_cubo.refresh)
+    registro = registro_ans.strip().zfill(6)
+    contas = [conta.strip()] if conta else _cubo.contas_padrao()
+    index = _service.index
+    if index.operadora(registro) is None and not _cubo.tem_operadora(registro):
+        raise HTTPException(status_code=404, detail=f"Operadora {registro} não encontrada")
+
+    def build():
+        series = _cubo.serie(registro, contas)
+        return {
+            "registro_ans": registro,
+            "operadora": index.operadora(registro),
+            "contas": contas,
+            "count": len(series),
+            "series": series,
+        }
+
+    key = ("series", _cubo.version, index.version, registro, tuple(contas))
+    return _json(_cache.get_or_build(key, build))
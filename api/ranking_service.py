@@ -0,0 +1,135 @@
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from etl.transform.to_parquet import SUCCESS_MARKER, read_parquet_dataset
+
+DEFAULT_DEMO_CSV_PATH = (
+    Path(__file__).resolve().parent.parent
+    / "etl" / "data" / "interim" / "demo_consolidado_normalized.csv"
+)
+
+def _file_signature(path: Path) -> Optional[Tuple[int, int]]:
+    """Assinatura barata do arquivo (mtime em ns, tamanho) usada para detectar mudanças."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+class RankingService:
+    """Ranking de operadoras por valor, agregado uma única vez e servido da memória.
+
+    O agregado completo (todas as operadoras, já ordenado) é reconstruído apenas
+    quando o mtime/tamanho do arquivo de origem muda; o top-N é um simples fatiamento.
+    Se existir o dataset Parquet irmão do CSV, ele é preferido e só as colunas
+    necessárias são lidas.
+    """
+
+    # Colunas usadas pelo ranking no dataset Parquet (reg_ans, "razão", valor)
+    PARQUET_COLUMNS = ["reg_ans", "descricao_norm", "vl_saldo_final_num"]
+
+    def __init__(self, csv_path: Optional[str] = None, parquet_path: Optional[str] = None):
+        self.csv_path = Path(csv_path) if csv_path else DEFAULT_DEMO_CSV_PATH
+        self.parquet_path = Path(parquet_path) if parquet_path else self.csv_path.with_suffix(".parquet")
+        self._ranking: List[Dict[str, Any]] = []
+        self._signature: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+        # Incrementada a cada rebuild; invalida respostas em cache
+        self.version = 0
+
+    def _use_parquet(self) -> bool:
+        return (self.parquet_path / SUCCESS_MARKER).exists()
+
+    def _source_signature(self) -> Optional[Tuple[int, int]]:
+        if self._use_parquet():
+            return _file_signature(self.parquet_path / SUCCESS_MARKER)
+        return _file_signature(self.csv_path)
+
+    def _read(self) -> pd.DataFrame:
+        if self._use_parquet():
+            try:
+                df = read_parquet_dataset(self.parquet_path, columns=self.PARQUET_COLUMNS)
+                # Categorias viram texto comum para o groupby se comportar como no CSV
+                return df.astype({"reg_ans": object, "descricao_norm": object})
+            except ImportError as e:
+                print(f"{e} Usando o CSV.")
+        # Leitura blindada; tudo como texto (reg_ans mantém os zeros à esquerda, como no Parquet)
+        return pd.read_csv(self.csv_path, sep=None, engine='python', encoding='utf-8-sig', on_bad_lines='skip', quoting=3, dtype=str)
+
+    def _build(self) -> List[Dict[str, Any]]:
+        df = self._read()
+
+        # Normalização das colunas
+        df.columns = [str(c).strip().upper() for c in df.columns]
+
+        # Busca segura de colunas para evitar "index out of range"
+        def find_col(keywords):
+            for kw in keywords:
+                match = [c for c in df.columns if kw in c]
+                if match: return match[0]
+            return None
+
+        c_ans = find_col(['REG_ANS', 'REGISTRO'])
+        c_razao = find_col(['RAZAO', 'NOME', 'SOCIAL', 'DESCRICAO_NORM'])
+        c_valor = find_col(['VL_SALDO_FINAL_NUM', 'VALOR_REAL', 'SALDO'])
+
+        if not all([c_ans, c_razao, c_valor]):
+            print(f"Colunas ausentes no CSV. Encontradas: {list(df.columns)}")
+            return []
+
+        # Garante que o valor é numérico
+        df[c_valor] = pd.to_numeric(df[c_valor], errors='coerce').fillna(0)
+        # Registro ANS como texto de 6 dígitos, igual para CSV e Parquet
+        df = df[df[c_ans].notna()]
+        df[c_ans] = df[c_ans].astype(str).str.strip().str.zfill(6)
+
+        # Agrupamento e Ranking (completo; o top-N é feito na consulta)
+        ranking = df.groupby(c_ans).agg({
+            c_razao: 'first',
+            c_valor: 'sum'
+        }).sort_values(c_valor, ascending=False).reset_index()
+
+        # Padronização para o Frontend Vue
+        ranking.columns = ['reg_ans', 'Razao Social', 'valor_real']
+        return ranking.to_dict(orient="records")
+
+    def refresh(self) -> bool:
+        """Reconstrói o agregado se o arquivo mudou. Retorna True se houve rebuild."""
+        signature = self._source_signature()
+        if signature == self._signature:
+            return False
+
+        with self._lock:
+            # Outra thread pode ter reconstruído enquanto esperávamos o lock
+            signature = self._source_signature()
+            if signature == self._signature:
+                return False
+
+            if signature is None:
+                print(f"Arquivo não encontrado: {self.csv_path}")
+                ranking: List[Dict[str, Any]] = []
+            else:
+                try:
+                    ranking = self._build()
+                except Exception as e:
+                    print(f"Erro no processamento do Ranking: {e}")
+                    ranking = []
+
+            self._ranking = ranking
+            self._signature = signature
+            self.version += 1
+            return True
+
+    def top(self, n: int = 10) -> List[Dict[str, Any]]:
+        """As `n` primeiras do ranking carregado; não recarrega (chame `refresh` antes)."""
+        return self._ranking[:n]
+
+def build_ranking_from_env() -> RankingService:
+    csv_path = os.getenv("DEMO_CONSOLIDADO_CSV_PATH")
+    service = RankingService(csv_path=csv_path)
+    service.refresh()
+    return service
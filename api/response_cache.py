@@ -0,0 +1,87 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+try:
+    import orjson
+except ImportError:  # opcional: sem orjson usa o json da stdlib (mesmo formato compacto)
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """Serializa para JSON compacto em UTF-8 (mesmo formato do JSONResponse do Starlette)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class ResponseCache:
+    """LRU de corpos JSON já serializados, limitado em número de entradas e em bytes.
+
+    As chaves devem incluir a versão dos dados que geraram a resposta: ao recarregar os
+    dados a versão muda, as chaves antigas deixam de ser consultadas e saem pelo LRU.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: Hashable, body: bytes) -> None:
+        # Respostas maiores que o limite inteiro não são guardadas
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = body
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Any]) -> bytes:
+        """Corpo em cache para `key`; se ausente, serializa `build()` e guarda."""
+        body = self.get(key)
+        if body is None:
+            body = dumps(build())
+            self.put(key, body)
+        return body
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+def build_response_cache_from_env() -> ResponseCache:
+    try:
+        entries = int(os.getenv("ANS_RESPONSE_CACHE_ENTRIES", "1024"))
+        max_mb = float(os.getenv("ANS_RESPONSE_CACHE_MB", "32"))
+    except ValueError:
+        entries, max_mb = 1024, 32.0
+    return ResponseCache(max_entries=max(0, entries), max_bytes=int(max_mb * 1024 * 1024))
@@ -1,8 +1,14 @@
+import heapq
 import os
+import re
+import threading
+import time
 import unicodedata
-from dataclasses import dataclass
+from array import array
+from bisect import bisect_left
+from collections import Counter
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
 import pandas as pd
 
@@ -11,6 +17,28 @@ DEFAULT_CADOP_CSV_PATH = (
     / "etl" / "data" / "raw" / "operadoras_ativas" / "relatorio_cadop.csv"
 )
 
+# Tamanho dos n-gramas do índice invertido; consultas menores caem na varredura linear
+NGRAM_SIZE = 3
+
+# Campos devolvidos em cada resultado, na ordem da resposta
+ITEM_FIELDS = ("registro_ans", "cnpj", "razao_social", "nome_fantasia", "modalidade")
+
+# Campos indexados e seus pesos no score
+SEARCH_FIELDS = (
+    ("registro_ans", 10),
+    ("cnpj", 9),
+    ("nome_fantasia", 5),
+    ("razao_social", 4),
+)
+
+# Busca aproximada (fuzzy): orçamento fixo de trabalho por consulta, independente do catálogo
+FUZZY_MAX_POSTINGS = 5000  # ids lidos das listas de n-gramas na geração de candidatos
+FUZZY_MAX_VERIFY = 100     # candidatos verificados com distância de edição
+
+# Campos do autocomplete; nos numéricos a chave é só dígitos (CNPJ sem pontuação)
+SUGGEST_FIELDS = ("registro_ans", "cnpj", "nome_fantasia", "razao_social")
+NUMERIC_FIELDS = {"registro_ans", "cnpj"}
+
 def _normalize_text(value: Optional[str]) -> str:
     if value is None:
         return ""
@@ -20,96 +48,468 @@ def _normalize_text(value: Optional[str]) -> str:
     s = " ".join(s.split())
     return s
 
-@dataclass
-class SearchHit:
-    score: int
-    item: Dict[str, Any]
+def _normalize_column(values: pd.Series) -> List[str]:
+    """Versão vetorizada de _normalize_text para uma coluna inteira."""
+    s = values.astype(str).str.strip().str.lower().str.normalize("NFKD")
+    # Remove apenas os caracteres combinantes que de fato aparecem na coluna
+    combining = {ord(ch): None for ch in set("".join(s)) if unicodedata.combining(ch)}
+    if combining:
+        s = s.str.translate(combining)
+    s = s.str.replace(r"\s+", " ", regex=True).str.strip()
+    return s.tolist()
+
+def _column(df: pd.DataFrame, *names: str) -> pd.Series:
+    """Primeira coluna existente dentre `names` como texto (ou vazia)."""
+    for name in names:
+        if name in df.columns:
+            return df[name].astype(str)
+    return pd.Series([""] * len(df), index=df.index, dtype=object)
+
+def _ngrams(text: str, n: int = NGRAM_SIZE) -> Set[str]:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+def _max_edits(q: str) -> int:
+    return 1 if len(q) <= 6 else 2
+
+def _distance_to(pattern: str) -> Callable[[str], int]:
+    """Função que dá a menor distância de edição entre `pattern` e qualquer trecho de um texto.
+
+    Algoritmo bit-paralelo de Myers (busca aproximada): O(len(text)) operações com
+    inteiros, em vez da matriz len(pattern) x len(text) da programação dinâmica. A tabela
+    de bits do padrão é montada uma vez e reaproveitada para todos os textos.
+    """
+    m = len(pattern)
+    peq: Dict[str, int] = {}
+    for i, ch in enumerate(pattern):
+        peq[ch] = peq.get(ch, 0) | (1 << i)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1) if m else 0
+
+    def distance(text: str) -> int:
+        if pattern in text:
+            return 0
+        pv, mv, score = mask, 0, m
+        best = m
+        for ch in text:
+            eq = peq.get(ch, 0)
+            xv = eq | mv
+            xh = (((eq & pv) + pv) ^ pv) | eq
+            ph = mv | ~(xh | pv)
+            mh = pv & xh
+            if ph & high:
+                score += 1
+            elif mh & high:
+                score -= 1
+                if score < best:
+                    best = score
+            # Na busca o trecho pode começar em qualquer posição: sem o "| 1" da distância global
+            ph = (ph << 1) & mask
+            mh = (mh << 1) & mask
+            pv = (mh | ~(xv | ph)) & mask
+            mv = ph & xv
+        return best
+
+    return distance
+
+def _substring_distance(pattern: str, text: str) -> int:
+    return _distance_to(pattern)(text)
+
+def _word_suffixes(text: str) -> List[str]:
+    """Sufixos que começam em cada palavra após a primeira ("unimed belo" -> ["belo"])."""
+    return [text[m.start():] for m in re.finditer(r"(?<= )\S", text)]
+
+class PrefixIndex:
+    """Chaves normalizadas ordenadas + ids paralelos; prefixos resolvidos com bisect."""
+
+    def __init__(self, entries: List[Tuple[str, int, str]]):
+        entries.sort()
+        self.keys: List[str] = [k for k, _, _ in entries]
+        self.ids = array("i", [i for _, i, _ in entries])
+        self.fields: List[str] = [f for _, _, f in entries]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def scan(self, prefix: str):
+        """(id, campo) das chaves que começam com `prefix`, em ordem alfabética."""
+        i = bisect_left(self.keys, prefix)
+        while i < len(self.keys) and self.keys[i].startswith(prefix):
+            yield self.ids[i], self.fields[i]
+            i += 1
+
+class SearchIndex:
+    """Índice imutável de um carregamento do CADOP (colunas, n-gramas, prefixos).
+
+    Uma vez construído não é mais alterado: o serviço troca a referência inteira ao
+    recarregar, e cada consulta usa do início ao fim o mesmo índice.
+    """
+
+    def __init__(self, records: Dict[str, List[str]], version: int = 0, load_seconds: float = 0.0):
+        # Armazenamento colunar: uma lista por campo em vez de um dict por registro
+        self._records = {f: list(records.get(f, [])) for f in ITEM_FIELDS}
+        self._size = len(self._records[ITEM_FIELDS[0]])
+        normalized = {f: _normalize_column(pd.Series(self._records[f], dtype=object)) for f, _ in SEARCH_FIELDS}
+        self._normalized: Dict[str, List[str]] = normalized
+        self._postings = self._build_postings(normalized)
+        # Caracteres presentes em cada campo indexado (limita o score máximo de uma consulta)
+        self._alphabets: Dict[str, Set[str]] = {f: set("".join(v)) for f, v in normalized.items()}
+        # Autocomplete: início de cada campo e, nos nomes, início de cada palavra
+        self._prefix_starts, self._prefix_words = self._build_prefix_indexes(normalized)
+        # Registro ANS (6 dígitos, como no consolidado) -> posição, para juntar metadados
+        self._by_registro = {r.zfill(6): i for i, r in enumerate(self._records["registro_ans"]) if r}
+
+        self.version = version
+        self.loaded_at = time.time()
+        self.load_seconds = load_seconds
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _item(self, i: int) -> Dict[str, Any]:
+        return {field: self._records[field][i] for field in ITEM_FIELDS}
+
+    def operadora(self, registro_ans: str) -> Optional[Dict[str, Any]]:
+        """Cadastro da operadora pelo registro ANS (com ou sem zeros à esquerda)."""
+        i = self._by_registro.get(str(registro_ans).strip().zfill(6))
+        return self._item(i) if i is not None else None
+
+    @staticmethod
+    def _build_postings(normalized: Dict[str, List[str]]) -> Dict[str, List[int]]:
+        """Índice invertido n-grama -> ids dos registros (em ordem crescente)."""
+        postings: Dict[str, List[int]] = {}
+        for i, values in enumerate(zip(*(normalized[f] for f, _ in SEARCH_FIELDS))):
+            grams: Set[str] = set()
+            for value in values:
+                grams |= _ngrams(value)
+            for g in grams:
+                postings.setdefault(g, []).append(i)
+        return postings
+
+    @staticmethod
+    def _build_prefix_indexes(normalized: Dict[str, List[str]]) -> Tuple[PrefixIndex, PrefixIndex]:
+        starts: List[Tuple[str, int, str]] = []
+        words: List[Tuple[str, int, str]] = []
+        for field in SUGGEST_FIELDS:
+            for i, value in enumerate(normalized[field]):
+                if field in NUMERIC_FIELDS:
+                    value = re.sub(r"\D", "", value)
+                if not value:
+                    continue
+                starts.append((value, i, field))
+                if field not in NUMERIC_FIELDS:
+                    words.extend((suffix, i, field) for suffix in _word_suffixes(value))
+        return PrefixIndex(starts), PrefixIndex(words)
+
+    def _candidates(self, q: str) -> Optional[List[int]]:
+        """Ids que contêm todos os n-gramas da consulta (None = consulta curta demais)."""
+        grams = _ngrams(q)
+        if not grams:
+            return None
+
+        lists = []
+        for g in grams:
+            ids = self._postings.get(g)
+            if not ids:
+                return []
+            lists.append(ids)
+
+        lists.sort(key=len)
+        result = set(lists[0])
+        for ids in lists[1:]:
+            result.intersection_update(ids)
+            if not result:
+                return []
+        return sorted(result)
+
+    def _top_k(self, q: str, ids: Iterable[int], k: int) -> List[Tuple[int, int]]:
+        """(score, id) dos k melhores, score desc e id asc (mesma ordem do sort estável).
+
+        Mantém só um heap de k entradas e para assim que o k-ésimo atinge o score máximo
+        possível para a consulta: como os ids chegam em ordem crescente, nenhum candidato
+        restante passaria à frente (empate perde para o id menor).
+        """
+        # Campos que não têm algum caractere da consulta nunca casam (ex.: letras no CNPJ)
+        chars = set(q)
+        columns = [
+            (self._normalized[field], weight)
+            for field, weight in SEARCH_FIELDS
+            if chars <= self._alphabets[field]
+        ]
+        ceiling = sum(weight for _, weight in columns)
+        if ceiling == 0 or k <= 0:
+            return []
+
+        heap: List[Tuple[int, int]] = []  # (score, -id): o topo é o pior dos k
+        for i in ids:
+            score = 0
+            for values, weight in columns:
+                if q in values[i]: score += weight
+            if score == 0:
+                continue
+
+            if len(heap) < k:
+                heapq.heappush(heap, (score, -i))
+            elif score > heap[0][0]:
+                heapq.heapreplace(heap, (score, -i))
+            else:
+                continue
+            if len(heap) == k and heap[0][0] == ceiling:
+                break
+
+        return [(score, -neg) for score, neg in sorted(heap, reverse=True)]
+
+    def search(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
+        q = _normalize_text(query)
+        if not q:
+            return []
+
+        # O índice só reduz o conjunto de candidatos; o score é sempre confirmado no texto
+        ids = self._candidates(q)
+        top = self._top_k(q, range(self._size) if ids is None else ids, limit)
+        return [{"score": score, **self._item(i)} for score, i in top]
+
+    def _fuzzy_candidates(self, q: str, max_edits: int) -> List[int]:
+        """Ids que podem estar a até `max_edits` edições de `q`, pelo lema dos q-gramas.
+
+        Um trecho a k edições de `q` preserva ao menos L - k*n dos L n-gramas da consulta,
+        então todo candidato aparece em alguma das L - T + 1 listas mais raras (T = mínimo
+        exigido). Essas listas geram os candidatos; as demais só completam a contagem.
+        A leitura de listas e a quantidade verificada são limitadas por orçamento fixo.
+        """
+        grams = _ngrams(q)
+        lists = sorted((self._postings.get(g, []) for g in grams), key=len)
+        threshold = max(1, len(lists) - max_edits * NGRAM_SIZE)
+        n_prefix = len(lists) - threshold + 1
+
+        counts: Counter = Counter()
+        budget = FUZZY_MAX_POSTINGS
+        for ids in lists[:n_prefix]:
+            ids = ids[:budget]
+            counts.update(ids)
+            budget -= len(ids)
+            if budget <= 0:
+                break
+
+        # Completar a contagem custa por candidato: só os mais promissores seguem
+        if len(counts) > 4 * FUZZY_MAX_VERIFY:
+            top = heapq.nlargest(4 * FUZZY_MAX_VERIFY, counts.items(), key=lambda kv: (kv[1], -kv[0]))
+            counts = Counter(dict(top))
+
+        for ids in lists[n_prefix:]:
+            if len(ids) <= len(counts):
+                for i in ids:
+                    if i in counts:
+                        counts[i] += 1
+            else:
+                for i in counts:
+                    j = bisect_left(ids, i)
+                    if j < len(ids) and ids[j] == i:
+                        counts[i] += 1
+
+        eligible = ((c, -i) for i, c in counts.items() if c >= threshold)
+        return [-neg for _, neg in heapq.nlargest(FUZZY_MAX_VERIFY, eligible)]
+
+    def search_fuzzy(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Busca tolerante a erros de digitação ("unimde", "bradesco saude" sem uma letra).
+
+        Cada campo a até k edições da consulta (k = 1 até 6 caracteres, senão 2) soma
+        peso * (k + 1 - distância): acerto exato vale mais que aproximado e os pesos dos
+        campos continuam valendo. Consultas curtas demais para n-gramas usam a busca exata.
+        """
+        q = _normalize_text(query)
+        if len(q) <= NGRAM_SIZE:
+            return self.search(query, limit)
+
+        k = _max_edits(q)
+        distance = _distance_to(q)
+        columns = [(self._normalized[field], weight) for field, weight in SEARCH_FIELDS]
+        hits = []
+        for i in self._fuzzy_candidates(q, k):
+            score, best = 0, k + 1
+            for values, weight in columns:
+                d = distance(values[i])
+                if d <= k:
+                    score += weight * (k + 1 - d)
+                    best = min(best, d)
+            if score > 0:
+                hits.append((-score, best, i))
+
+        hits.sort()
+        return [{"score": -neg, "distancia": best, **self._item(i)} for neg, best, i in hits[:limit]]
+
+    def suggest(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Autocomplete: até `limit` operadoras cujo campo (ou palavra do nome) começa com a consulta.
+
+        Inícios de campo vêm antes de inícios de palavra; dentro de cada grupo, ordem
+        alfabética. Consultas numéricas ("29.309.127") casam com CNPJ/registro só por dígitos.
+        """
+        q = _normalize_text(query)
+        digits = re.sub(r"[.\-/ ]", "", q)
+        if digits.isdigit():
+            q = digits
+        if not q:
+            return []
+
+        seen: Set[int] = set()
+        out: List[Dict[str, Any]] = []
+        for index in (self._prefix_starts, self._prefix_words):
+            for i, field in index.scan(q):
+                if len(out) >= limit:
+                    return out
+                if i not in seen:
+                    seen.add(i)
+                    out.append({"campo": field, **self._item(i)})
+        return out
 
 class OperadorasSearchService:
+    """Busca de operadoras sobre o índice carregado mais recente.
+
+    `load()` monta um novo `SearchIndex` e troca a referência de uma vez (atribuição
+    atômica): consultas em andamento terminam no índice anterior e as seguintes já
+    usam o novo. Com `start_watcher` o CSV é verificado periodicamente e recarregado
+    em segundo plano quando muda.
+    """
+
     def __init__(self, csv_path: Optional[str] = None):
         self.csv_path = Path(csv_path) if csv_path else DEFAULT_CADOP_CSV_PATH
-        self._items: List[Dict[str, Any]] = []
-        self._index: List[Dict[str, str]] = []
+        self._index = SearchIndex({})
+        self._signature: Optional[Tuple[int, int]] = None
+        self._load_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def index(self) -> SearchIndex:
+        return self._index
 
-    def load(self) -> None:
-        """Carrega e limpa o CSV tratando o título e o separador TAB."""
+    @property
+    def version(self) -> int:
+        """Incrementada a cada carga bem-sucedida; invalida respostas em cache."""
+        return self._index.version
+
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = self.csv_path.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _read_records(self) -> Dict[str, List[str]]:
+        """Lê e limpa o CSV tratando o título e o separador TAB."""
+        # Pula o título e tenta ler como TAB (conforme sua amostra)
+        df = pd.read_csv(
+            self.csv_path, 
+            skiprows=1, 
+            sep='\t', 
+            dtype=str, 
+            encoding="latin1",
+            quoting=3 
+        )
+        
+        # Fallback se o TAB não separar as colunas
+        if len(df.columns) < 2:
+            df = pd.read_csv(self.csv_path, skiprows=1, sep=None, engine='python', encoding="latin1", quoting=3)
+
+        # Limpeza de cabeçalhos
+        df.columns = [str(c).strip().upper() for c in df.columns]
+        df = df.fillna("")
+
+        # Mapeamento robusto: busca a coluna mesmo com nomes ligeiramente diferentes
+        records = {
+            "registro_ans": _column(df, "REGISTRO ANS").str.strip().str.replace('"', '', regex=False),
+            "cnpj": _column(df, "CNPJ").str.strip(),
+            "razao_social": _column(df, "RAZÃO SOCIAL", "RAZAO SOCIAL").str.strip().str.replace('"', '', regex=False),
+            "nome_fantasia": _column(df, "NOME FANTASIA").str.strip(),
+            "modalidade": _column(df, "MODALIDADE").str.strip(),
+        }
+        return {field: col.tolist() for field, col in records.items()}
+
+    def load(self) -> bool:
+        """Carrega o CSV em um novo índice e o publica. Retorna True se houve troca.
+
+        Em caso de erro o índice atual continua valendo.
+        """
         if not self.csv_path.exists():
             raise FileNotFoundError(f"CSV do CADOP não encontrado: {self.csv_path}")
 
-        try:
-            # Pula o título e tenta ler como TAB (conforme sua amostra)
-            df = pd.read_csv(
-                self.csv_path, 
-                skiprows=1, 
-                sep='\t', 
-                dtype=str, 
-                encoding="latin1",
-                quoting=3 
-            )
-            
-            # Fallback se o TAB não separar as colunas
-            if len(df.columns) < 2:
-                df = pd.read_csv(self.csv_path, skiprows=1, sep=None, engine='python', encoding="latin1", quoting=3)
-
-            # Limpeza de cabeçalhos
-            df.columns = [str(c).strip().upper() for c in df.columns]
-            df = df.fillna("")
-
-            items = []
-            index = []
-
-            for _, row in df.iterrows():
-                # Mapeamento robusto: busca a coluna mesmo com nomes ligeiramente diferentes
-                reg_ans = str(row.get("REGISTRO ANS", "")).strip().replace('"', '')
-                cnpj = str(row.get("CNPJ", "")).strip()
-                razao = str(row.get("RAZÃO SOCIAL", row.get("RAZAO SOCIAL", ""))).strip().replace('"', '')
-                fantasia = row.get("NOME FANTASIA", "").strip()
-                modalidade = row.get("MODALIDADE", "").strip()
-
-                item_data = {
-                    "registro_ans": reg_ans,
-                    "cnpj": cnpj,
-                    "razao_social": razao,
-                    "nome_fantasia": fantasia,
-                    "modalidade": modalidade
-                }
-
-                items.append(item_data)
-                index.append({
-                    "registro_ans": _normalize_text(reg_ans),
-                    "cnpj": _normalize_text(cnpj),
-                    "razao_social": _normalize_text(razao),
-                    "nome_fantasia": _normalize_text(fantasia),
-                })
-
-            self._items = items
+        with self._load_lock:
+            try:
+                signature = self._file_signature()
+                start = time.perf_counter()
+                records = self._read_records()
+                index = SearchIndex(
+                    records,
+                    version=self._index.version + 1,
+                    load_seconds=time.perf_counter() - start,
+                )
+            except Exception as e:
+                print(f"Erro ao carregar busca: {e}")
+                return False
+
             self._index = index
-            print(f"Sucesso: {len(self._items)} operadoras carregadas.")
+            self._signature = signature
+            print(f"Sucesso: {len(index)} operadoras carregadas (versão {index.version}, {index.load_seconds:.2f}s).")
+            return True
 
-        except Exception as e:
-            print(f"Erro ao carregar busca: {e}")
+    def reload_if_changed(self) -> bool:
+        """Recarrega se o mtime/tamanho do CSV mudou desde a última carga."""
+        signature = self._file_signature()
+        if signature is None or signature == self._signature:
+            return False
+        return self.load()
 
-    def search(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
-        q = _normalize_text(query)
-        if not q:
-            return []
+    def start_watcher(self, interval: float) -> None:
+        """Verifica o CSV a cada `interval` segundos em uma thread de fundo."""
+        if self._watcher is not None or interval <= 0:
+            return
 
-        hits: List[SearchHit] = []
-        for item, idx in zip(self._items, self._index):
-            score = 0
-            if q in idx.get("registro_ans", ""): score += 10
-            if q in idx.get("cnpj", ""): score += 9
-            if q in idx.get("nome_fantasia", ""): score += 5
-            if q in idx.get("razao_social", ""): score += 4
+        def watch() -> None:
+            while not self._stop.wait(interval):
+                try:
+                    self.reload_if_changed()
+                except Exception as e:
+                    print(f"Erro ao recarregar busca: {e}")
 
-            if score > 0:
-                hits.append(SearchHit(score=score, item=item))
+        self._stop.clear()
+        self._watcher = threading.Thread(target=watch, name="cadop-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    def info(self) -> Dict[str, Any]:
+        index = self._index
+        return {
+            "versao": index.version,
+            "registros": len(index),
+            "carregado_em": index.loaded_at,
+            "tempo_carga_s": round(index.load_seconds, 3),
+        }
+
+    # Cada chamada lê `self._index` uma única vez: a consulta inteira usa o mesmo índice
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def search(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
+        return self._index.search(query, limit)
+
+    def search_fuzzy(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
+        return self._index.search_fuzzy(query, limit)
 
-        hits.sort(key=lambda h: h.score, reverse=True)
-        return [{"score": h.score, **h.item} for h in hits[:limit]]
+    def suggest(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        return self._index.suggest(query, limit)
 
 def build_service_from_env() -> OperadorasSearchService:
     csv_path = os.getenv("CADOP_CSV_PATH")
     service = OperadorasSearchService(csv_path=csv_path)
     service.load()
+    # Recarga automática quando o CSV muda (0 desativa)
+    try:
+        interval = float(os.getenv("CADOP_RELOAD_INTERVAL", "30"))
+    except ValueError:
+        interval = 30.0
+    service.start_watcher(interval)
     return service
\ No newline at end of file
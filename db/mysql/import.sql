@@ -34,6 +34,7 @@ IGNORE 1 LINES
 );
 
 -- Demonstrações contábeis:
+-- Alternativa sem staging nem caminhos manuais: python -m etl.load.bulk_load (ANS_DATABASE_URL)
 -- O ETL etl/transform/prepare_demonstracoes_contabeis.py gera um CSV consolidado em UTF-8:
 -- etl/data/interim/demonstracoes_contabeis_consolidado.csv
 --
@@ -32,6 +32,7 @@ FROM :cadop_csv_path
 WITH (FORMAT csv, HEADER true, DELIMITER ';', QUOTE '"', ENCODING 'LATIN1');
 
 -- Demonstrações contábeis
+-- Alternativa sem staging nem caminhos manuais: python -m etl.load.bulk_load (ANS_DATABASE_URL)
 -- O ETL etl/transform/prepare_demonstracoes_contabeis.py gera um CSV consolidado em UTF-8:
 -- etl/data/interim/demonstracoes_contabeis_consolidado.csv
 
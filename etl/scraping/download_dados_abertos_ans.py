@@ -7,6 +7,8 @@ from pathlib import Path
 from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 
+from etl.scraping.http_download import DEFAULT_WORKERS, HttpCache, download_if_modified, download_many
+
 # Configuração de Logs Simples
 def log(msg):
     print(f"[*] {msg}")
@@ -16,6 +18,8 @@ def log(msg):
 # Estrutura esperada: raiz/etl/scraping/script.py -> RAW_DIR: raiz/data/raw
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 RAW_DIR = PROJECT_ROOT / "data" / "raw"
+# Validadores HTTP e listagens de ZIPs já interpretadas, por URL
+HTTP_CACHE_PATH = RAW_DIR / "http_cache.json"
 
 DEMONSTRACOES_BASE_URL = "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/"
 CADOP_URL = "https://www.gov.br/ans/pt-br/arquivos/acesso-a-informacao/perfil-do-setor/dados-e-indicadores-do-setor/operadoras-de-planos-privados-de-saude/relatorio_cadop.csv"
@@ -26,89 +30,97 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 def _safe_mkdir(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
-def _download(url: str, dest: Path, timeout: int = 180) -> Path:
-    """Realiza o download de arquivos grandes em chunks."""
-    _safe_mkdir(dest.parent)
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-    }
-
-    # verify=False é necessário para o servidor PDA da ANS devido a certificados instáveis
-    with requests.get(url, stream=True, timeout=timeout, verify=False, headers=headers) as r:
-        r.raise_for_status()
-        with open(dest, "wb") as f:
-            # Download em blocos de 1MB para eficiência
-            for chunk in r.iter_content(chunk_size=1024 * 1024):
-                if chunk:
-                    f.write(chunk)
-    return dest
+def _new_session() -> requests.Session:
+    session = requests.Session()
+    session.verify = False
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0.0.0'
+    })
+    return session
+
+def _download_workers() -> int:
+    """Downloads simultâneos (env ANS_DOWNLOAD_WORKERS); o servidor da ANS é lento por conexão."""
+    try:
+        return max(1, int(os.getenv("ANS_DOWNLOAD_WORKERS", str(DEFAULT_WORKERS))))
+    except ValueError:
+        return DEFAULT_WORKERS
+
+def _parse_zip_links(html: str, base_url: str) -> list[str]:
+    """Links .zip de uma listagem de diretório do FTP/PDA."""
+    soup = BeautifulSoup(html, "html.parser")
+    zips = []
+    for a in soup.find_all("a", href=True):
+        href = a["href"]
+        if href.lower().endswith(".zip"):
+            zips.append(urljoin(base_url, href))
+    return zips
 
 def download_demonstracoes_contabeis_last_2_years() -> list[Path]:
-    """Baixa os ZIPs trimestrais de 2023 e 2024 (dados estáveis no servidor)."""
+    """Baixa os ZIPs trimestrais de 2023 e 2024 (dados estáveis no servidor).
+
+    Os ZIPs são baixados em paralelo e de forma retomável (ver `http_download`):
+    arquivos inalterados no servidor não são baixados de novo e downloads
+    interrompidos continuam de onde pararam.
+    """
     
     # Definimos anos fixos pois o servidor da ANS demora a subir o ano corrente
     years = [2023, 2024]
-    downloaded: list[Path] = []
+    jobs: list[tuple[str, Path]] = []
     
-    session = requests.Session()
-    session.verify = False 
-    session.headers.update({
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0.0.0'
-    })
+    session = _new_session()
+    # Listagens inalteradas (304) vêm do cache, sem baixar nem interpretar o HTML
+    cache = HttpCache(HTTP_CACHE_PATH)
 
     for y in years:
         year_url = f"{DEMONSTRACOES_BASE_URL}{y}/"
         log(f"Listando arquivos em: {year_url}")
 
         try:
-            resp = session.get(year_url, timeout=45)
-            if resp.status_code != 200:
-                log(f"Aviso: Ano {y} não disponível no servidor (Status {resp.status_code})")
+            try:
+                zips = cache.get(session, year_url, lambda html: _parse_zip_links(html, year_url), timeout=45)
+            except requests.HTTPError as e:
+                log(f"Aviso: Ano {y} não disponível no servidor (Status {e.response.status_code})")
                 continue
 
-            soup = BeautifulSoup(resp.text, "html.parser")
-            zips = []
-            
-            # Busca todos os links que terminam em .zip
-            for a in soup.find_all("a", href=True):
-                href = a["href"]
-                if href.lower().endswith(".zip"):
-                    zips.append(urljoin(year_url, href))
-
             if not zips:
                 log(f"Nenhum arquivo ZIP encontrado para o ano {y}")
                 continue
 
             for zip_url in zips:
                 name = zip_url.split("/")[-1]
-                out = RAW_DIR / "demonstracoes_contabeis" / str(y) / name
-                
-                if out.exists():
-                    log(f"Arquivo ignorado (já existe): {name}")
-                    downloaded.append(out)
-                    continue
-
-                log(f"Baixando demonstração: {name}...")
-                downloaded.append(_download(zip_url, out))
+                jobs.append((zip_url, RAW_DIR / "demonstracoes_contabeis" / str(y) / name))
                 
         except Exception as e:
             log(f"Erro ao processar ano {y}: {e}")
 
-    return downloaded
+    workers = _download_workers()
+    log(f"Baixando {len(jobs)} ZIPs com {workers} conexões simultâneas...")
+    results = download_many(jobs, workers=workers, session_factory=_new_session, log=log)
+
+    for r in results:
+        if r.status == "falha":
+            log(f"Falha no download de {r.url}: {r.erro}")
+    return [r.path for r in results if r.status != "falha"]
 
 def download_operadoras_ativas_cadop() -> Path | None:
-    """Baixa o CSV de operadoras ativas (Relatório CADOP)."""
+    """Baixa o CSV de operadoras ativas (Relatório CADOP).
+
+    Usa GET condicional: se o arquivo não mudou no servidor (304), a cópia local é mantida.
+    Se o download falhar (rede ou HTTP), a cópia local existente é usada; None só sem ela.
+    """
     out = RAW_DIR / "operadoras_ativas" / "relatorio_cadop.csv"
     log(f"Iniciando download do CADOP: {CADOP_URL}")
 
     try:
-        if out.exists():
-            log("Arquivo CADOP já existe localmente.")
-            return out
-        return _download(CADOP_URL, out)
+        result = download_if_modified(CADOP_URL, out, session=_new_session())
+        if result.status == "inalterado":
+            log("Arquivo CADOP inalterado no servidor; usando a cópia local.")
+        return result.path
     except Exception as e:
         log(f"Falha no download do CADOP: {e}")
+        if out.exists():
+            log(f"Usando a cópia local existente: {out}")
+            return out
         return None
 
 def main():
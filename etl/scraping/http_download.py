@@ -0,0 +1,363 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import requests
+
+CHUNK_SIZE = 1024 * 1024
+
+# Download em andamento vai para "<arquivo>.part"; ao terminar, é renomeado atomicamente.
+# Cada arquivo (final ou parcial) tem ao lado um "<arquivo>.meta.json" com os validadores
+# HTTP (ETag, Content-Length, Last-Modified) da versão remota que ele representa.
+PART_SUFFIX = ".part"
+META_SUFFIX = ".meta.json"
+
+DEFAULT_WORKERS = 4
+DEFAULT_ATTEMPTS = 3
+
+
+@dataclass(frozen=True)
+class RemoteMeta:
+    """Validadores HTTP de uma versão do arquivo remoto."""
+
+    etag: Optional[str] = None
+    content_length: Optional[int] = None
+    last_modified: Optional[str] = None
+
+    @classmethod
+    def from_headers(cls, headers: Mapping[str, str]) -> "RemoteMeta":
+        length = headers.get("Content-Length")
+        # Em respostas 206 o tamanho total está em Content-Range ("bytes 0-99/1234")
+        content_range = headers.get("Content-Range")
+        if content_range and "/" in content_range:
+            length = content_range.rsplit("/", 1)[1]
+        return cls(
+            etag=headers.get("ETag"),
+            content_length=int(length) if length and length.isdigit() else None,
+            last_modified=headers.get("Last-Modified"),
+        )
+
+    def known(self) -> bool:
+        return any(v is not None for v in asdict(self).values())
+
+    def matches(self, other: "RemoteMeta") -> bool:
+        """Mesma versão remota: nenhum validador diverge e ao menos um foi comparado."""
+        compared = False
+        for field, value in asdict(self).items():
+            theirs = getattr(other, field)
+            if value is None or theirs is None:
+                continue
+            if value != theirs:
+                return False
+            compared = True
+        return compared
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Cabeçalhos de GET condicional: o servidor responde 304 se nada mudou."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def if_range(self) -> Optional[str]:
+        # If-Range não aceita ETag fraco (W/"..."); nesse caso usa a data
+        if self.etag and not self.etag.startswith("W/"):
+            return self.etag
+        return self.last_modified
+
+
+@dataclass
+class DownloadResult:
+    url: str
+    path: Path
+    status: str  # "baixado", "retomado", "inalterado" ou "falha"
+    bytes_transferidos: int = 0
+    erro: Optional[str] = None
+
+
+def _part_path(dest: Path) -> Path:
+    return dest.with_name(dest.name + PART_SUFFIX)
+
+
+def _meta_path(path: Path) -> Path:
+    return path.with_name(path.name + META_SUFFIX)
+
+
+def _load_meta(path: Path) -> Optional[RemoteMeta]:
+    try:
+        return RemoteMeta(**json.loads(_meta_path(path).read_text(encoding="utf-8")))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def _save_meta(path: Path, meta: RemoteMeta) -> None:
+    target = _meta_path(path)
+    tmp = target.with_name(target.name + ".tmp")
+    tmp.write_text(json.dumps(asdict(meta)), encoding="utf-8")
+    os.replace(tmp, target)
+
+
+def _remove(path: Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _probe(session: requests.Session, url: str, timeout: int) -> Tuple[RemoteMeta, bool]:
+    """HEAD no recurso: (validadores, aceita Range). Falhas viram metadados vazios."""
+    try:
+        r = session.head(url, timeout=timeout, allow_redirects=True)
+    except requests.RequestException:
+        return RemoteMeta(), False
+    if r.status_code >= 400:
+        return RemoteMeta(), False
+    return RemoteMeta.from_headers(r.headers), r.headers.get("Accept-Ranges", "").lower() == "bytes"
+
+
+def _is_complete(path: Path, meta: RemoteMeta) -> bool:
+    return meta.content_length is None or path.stat().st_size == meta.content_length
+
+
+def _expected_size(r: requests.Response, offset: int) -> Optional[int]:
+    """Tamanho que o arquivo deve ter ao fim da resposta, pelos cabeçalhos dela.
+
+    Em 206 vale o fim do intervalo em Content-Range ("bytes 100-199/*" -> 200); senão,
+    `offset` + Content-Length. None quando a resposta não informa o tamanho.
+    """
+    content_range = r.headers.get("Content-Range", "")
+    if r.status_code == 206 and content_range:
+        span = content_range.split()[-1].split("/")[0]
+        end = span.partition("-")[2]
+        if end.isdigit():
+            return int(end) + 1
+    length = r.headers.get("Content-Length")
+    if length and length.isdigit():
+        return offset + int(length)
+    return None
+
+
+def _stream_to(r: requests.Response, part: Path, offset: int, chunk_size: int) -> Tuple[int, Optional[int]]:
+    """Grava o corpo de `r` no `.part` (anexando a partir de `offset`). Retorna (bytes, tamanho esperado).
+
+    Sem tamanho nos cabeçalhos, só um corpo chunked tem o fim conferido (a biblioteca
+    acusa a conexão encerrada antes do último bloco); nos demais casos o tamanho
+    esperado fica desconhecido e o `.part` não é promovido.
+    """
+    expected = _expected_size(r, offset)
+    transferred = 0
+    with open(part, "ab" if offset else "wb") as f:
+        for chunk in r.iter_content(chunk_size=chunk_size):
+            if chunk:
+                f.write(chunk)
+                transferred += len(chunk)
+    if expected is None and "chunked" in r.headers.get("Transfer-Encoding", "").lower():
+        expected = offset + transferred
+    return transferred, expected
+
+
+def _discard(part: Path) -> None:
+    _remove(part)
+    _remove(_meta_path(part))
+
+
+def download_resumable(
+    url: str,
+    dest: Path,
+    session: Optional[requests.Session] = None,
+    timeout: int = 180,
+    chunk_size: int = CHUNK_SIZE,
+) -> DownloadResult:
+    """Baixa `url` em `dest`, retomando um `.part` anterior quando possível.
+
+    - arquivo final com validadores iguais aos do servidor não é baixado de novo;
+    - `.part` da mesma versão remota continua com `Range`/`If-Range`; se o servidor
+      responder 200 (sem suporte ou arquivo mudou) o download recomeça do zero, e um
+      416 (intervalo além do fim do arquivo remoto) descarta o `.part` e recomeça;
+    - o tamanho final é conferido com o Content-Length/Content-Range antes do rename
+      atômico; sem nenhum dos dois, o arquivo só é aceito se o corpo veio chunked.
+    Erros de rede propagam e deixam o `.part` no lugar para a próxima tentativa.
+    """
+    session = session or requests.Session()
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    remote, accepts_ranges = _probe(session, url, timeout)
+
+    if dest.exists():
+        local = _load_meta(dest)
+        if local is not None and local.matches(remote) and _is_complete(dest, remote):
+            return DownloadResult(url, dest, "inalterado")
+        # Arquivo de execuções anteriores (sem .meta.json): só é aceito se o tamanho confere
+        if local is None and remote.content_length is not None and dest.stat().st_size == remote.content_length:
+            _save_meta(dest, remote)
+            return DownloadResult(url, dest, "inalterado")
+
+    part = _part_path(dest)
+    offset = 0
+    if part.exists() and accepts_ranges:
+        part_meta = _load_meta(part)
+        if part_meta is not None and part_meta.matches(remote):
+            offset = part.stat().st_size
+
+    transferred = 0
+    while True:
+        headers = {}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            validator = remote.if_range()
+            if validator:
+                headers["If-Range"] = validator
+
+        with session.get(url, stream=True, timeout=timeout, headers=headers) as r:
+            if offset and r.status_code == 416:
+                if remote.content_length == offset:
+                    expected = offset  # o .part já estava completo; só falta validar e renomear
+                    break
+                # O .part passa do fim do arquivo remoto (trocado com os mesmos validadores)
+                _discard(part)
+                offset = 0
+                continue
+
+            r.raise_for_status()
+            if r.status_code != 206:
+                offset = 0
+                received = RemoteMeta.from_headers(r.headers)
+                remote = received if received.known() else remote
+                _save_meta(part, remote)
+            transferred, expected = _stream_to(r, part, offset, chunk_size)
+            break
+
+    _finalize(url, part, dest, remote, expected)
+    return DownloadResult(url, dest, "retomado" if offset else "baixado", transferred)
+
+
+def _finalize(url: str, part: Path, dest: Path, remote: RemoteMeta, expected: Optional[int] = None) -> None:
+    """Confere o tamanho do `.part` e o promove a arquivo final junto com seus metadados.
+
+    O tamanho esperado é o Content-Length da versão remota ou, na falta dele, `expected`
+    (vindo da resposta); sem nenhum dos dois o download não é aceito.
+    """
+    size = part.stat().st_size
+    if remote.content_length is not None:
+        expected = remote.content_length
+    if expected is None:
+        raise IOError(f"Download de {url} sem tamanho conferível (sem Content-Length/Content-Range)")
+    if size != expected:
+        raise IOError(f"Download incompleto de {url}: {size} de {expected} bytes")
+
+    # Metadados antigos saem antes do rename: um arquivo final nunca fica com validadores de outra versão
+    _remove(_meta_path(dest))
+    os.replace(part, dest)
+    _save_meta(dest, remote)
+    _remove(_meta_path(part))
+
+
+def download_if_modified(
+    url: str,
+    dest: Path,
+    session: Optional[requests.Session] = None,
+    timeout: int = 180,
+    chunk_size: int = CHUNK_SIZE,
+) -> DownloadResult:
+    """GET condicional para arquivos pequenos que mudam com frequência (ex.: CADOP).
+
+    Com validadores salvos, envia If-None-Match/If-Modified-Since: um 304 devolve a
+    cópia local sem transferir o corpo. Um 200 é gravado em `.part` e renomeado.
+    """
+    session = session or requests.Session()
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    local = _load_meta(dest) if dest.exists() else None
+    headers = local.conditional_headers() if local is not None else {}
+
+    part = _part_path(dest)
+    with session.get(url, stream=True, timeout=timeout, headers=headers) as r:
+        if r.status_code == 304 and local is not None:
+            return DownloadResult(url, dest, "inalterado")
+        r.raise_for_status()
+        remote = RemoteMeta.from_headers(r.headers)
+        transferred, expected = _stream_to(r, part, 0, chunk_size)
+
+    _finalize(url, part, dest, remote, expected)
+    return DownloadResult(url, dest, "baixado", transferred)
+
+
+class HttpCache:
+    """Cache de GET condicional para páginas cujo conteúdo interpretado é pequeno.
+
+    Guarda por URL os validadores (ETag/Last-Modified) e o resultado de `parse`
+    (precisa ser serializável em JSON) em um único arquivo. Em um 304 o resultado
+    salvo é devolvido sem baixar nem interpretar a página de novo.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        try:
+            self._entries: Dict[str, Dict[str, Any]] = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self._entries, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def get(self, session: requests.Session, url: str, parse: Callable[[str], Any], timeout: int = 45) -> Any:
+        """Conteúdo interpretado de `url`; erros HTTP propagam como `requests.HTTPError`."""
+        entry = self._entries.get(url)
+        headers = {}
+        if entry is not None:
+            headers = RemoteMeta(etag=entry.get("etag"), last_modified=entry.get("last_modified")).conditional_headers()
+
+        r = session.get(url, timeout=timeout, headers=headers)
+        if r.status_code == 304 and entry is not None:
+            return entry["data"]
+        r.raise_for_status()
+
+        data = parse(r.text)
+        meta = RemoteMeta.from_headers(r.headers)
+        if meta.etag or meta.last_modified:
+            self._entries[url] = {"etag": meta.etag, "last_modified": meta.last_modified, "data": data}
+            self._save()
+        return data
+
+
+def download_many(
+    jobs: Sequence[Tuple[str, Path]],
+    workers: int = DEFAULT_WORKERS,
+    session_factory: Callable[[], requests.Session] = requests.Session,
+    attempts: int = DEFAULT_ATTEMPTS,
+    timeout: int = 180,
+    log: Callable[[str], None] = print,
+) -> List[DownloadResult]:
+    """Baixa vários (url, destino) com no máximo `workers` conexões simultâneas.
+
+    Cada thread usa sua própria sessão. Uma falha é retentada (retomando o `.part`) até
+    `attempts` vezes; se persistir, o item volta com status "falha" sem interromper os demais.
+    O resultado segue a ordem de `jobs`.
+    """
+    local = threading.local()
+
+    def run(job: Tuple[str, Path]) -> DownloadResult:
+        url, dest = job
+        if not hasattr(local, "session"):
+            local.session = session_factory()
+
+        error: Optional[Exception] = None
+        for attempt in range(1, attempts + 1):
+            try:
+                result = download_resumable(url, dest, session=local.session, timeout=timeout)
+                log(f"{dest.name}: {result.status} ({result.bytes_transferidos / 1e6:.1f} MB)")
+                return result
+            except (requests.RequestException, OSError) as e:
+                error = e
+                log(f"{dest.name}: tentativa {attempt}/{attempts} falhou: {e}")
+        return DownloadResult(url, dest, "falha", erro=str(error))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(pool.map(run, jobs))
@@ -3,7 +3,10 @@ import os
 from pathlib import Path
 import pandas as pd
 import logging
-from etl.transform.prepare_demonstracoes_contabeis import extract_all_zips, consolidate_demonstracoes, INTERIM_DIR
+from etl.transform.prepare_demonstracoes_contabeis import collect_sources, consolidate_demonstracoes, output_formats, INTERIM_DIR
+from etl.transform.to_parquet import save_parquet_dataset
+from etl.transform.br_decimal import parse_br_decimal
+from etl.transform.cubo import CUBO_PATH, build_cubo, contas_por_descricao, save_cubo
 
 # Configuração de Log para monitorar o processamento
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
@@ -11,7 +14,10 @@ logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 CATEGORY = 'EVENTOS/ SINISTROS CONHECIDOS OU AVISADOS DE ASSISTÊNCIA A SAÚDE MEDICO HOSPITALAR'
 
 def clean_numeric(s):
-    """Converte padrão monetário brasileiro (milhar com ponto, decimal com vírgula)."""
+    """Converte padrão monetário brasileiro (milhar com ponto, decimal com vírgula).
+
+    Versão escalar de referência; o pipeline usa `parse_br_decimal`, vetorizada.
+    """
     if pd.isna(s) or str(s).strip().lower() in ['nan', 'none', '']:
         return 0.0
     s = str(s).strip()
@@ -22,24 +28,11 @@ def clean_numeric(s):
     except:
         return 0.0
 
-def get_desacumulado(df_subset):
-    """Subtrai o trimestre anterior do atual para obter o gasto real do período."""
-    df = df_subset.copy()
-    df = df.sort_values(['reg_ans', 'ano', 'trimestre'])
-    
-    df['valor_real'] = df['vl_saldo_final_num']
-    # Apenas subtrai se for a mesma operadora, mesmo ano e trimestre > 1
-    mask_subtrair = (df['trimestre'] > 1)
-    df.loc[mask_subtrair, 'valor_real'] = df['vl_saldo_final_num'] - df.groupby(['reg_ans', 'ano'])['vl_saldo_final_num'].shift(1)
-    
-    df['valor_real'] = df['valor_real'].fillna(df['vl_saldo_final_num'])
-    return df
-
 def main():
     logging.info('=== Requisito 3.5: Processamento Analítico ===')
     
     # 1. Extração e Consolidação
-    extracted = extract_all_zips()
+    extracted = collect_sources()
     if not extracted:
         logging.error('Nenhum ZIP extraído.')
         return
@@ -50,31 +43,39 @@ def main():
         return
 
     # 2. Limpeza de Dados
-    df['vl_saldo_final_num'] = df['vl_saldo_final'].map(clean_numeric)
+    df['vl_saldo_final_num'], n_falhas = parse_br_decimal(df['vl_saldo_final'])
+    if n_falhas:
+        logging.warning(f'{n_falhas} valores de vl_saldo_final não puderam ser convertidos (considerados 0).')
     
     # Normaliza reg_ans para 6 dígitos (essencial para o Merge)
     df['reg_ans'] = df['reg_ans'].astype(str).str.replace(r'\.0$', '', regex=True).str.strip().str.zfill(6)
 
-    # 3. Filtragem de Categoria Assistencial
+    # 3. Ajuste de Datas (Evita nanT/nan)
+    df['ano'] = pd.to_numeric(df['ano'], errors='coerce')
+    df['trimestre'] = pd.to_numeric(df['trimestre'], errors='coerce')
+    
+    # Se ainda houver NaNs, tentamos preencher com 2024 (ano base do download)
+    df['ano'] = df['ano'].fillna(2024).astype(int)
+    df['trimestre'] = df['trimestre'].fillna(4).astype(int)
+
+    # 4. Cubo trimestral (todas as contas e operadoras, acumulado e por trimestre)
+    cubo = build_cubo(df)
+    n_lacunas = int(cubo['lacuna'].sum())
+    if n_lacunas:
+        logging.warning(f'{n_lacunas} trimestres sem o trimestre anterior no mesmo ano (valor_real indefinido).')
+    cubo_path = save_cubo(cubo, CUBO_PATH)
+    logging.info(f'Cubo trimestral salvo em: {cubo_path} ({len(cubo)} linhas)')
+
+    # 5. Filtragem de Categoria Assistencial (direto do cubo, já desacumulado)
     df['descricao_norm'] = df['descricao_conta'].astype(str).str.strip().str.upper()
-    mask = df['descricao_norm'].str.contains('SINISTROS CONHECIDOS') & df['descricao_norm'].str.contains('HOSPITALAR')
-    subset = df[mask].copy()
+    descricoes = cubo.groupby('cd_conta_contabil', observed=True)['descricao_conta'].first()
+    contas = contas_por_descricao(descricoes)
+    subset = cubo[cubo['cd_conta_contabil'].isin(contas)].astype({'reg_ans': str, 'ano': int, 'trimestre': int})
 
     if subset.empty:
         logging.error('Categoria de despesas não encontrada nos dados.')
         return
 
-    # 4. Ajuste de Datas (Evita nanT/nan)
-    subset['ano'] = pd.to_numeric(subset['ano'], errors='coerce')
-    subset['trimestre'] = pd.to_numeric(subset['trimestre'], errors='coerce')
-    
-    # Se ainda houver NaNs, tentamos preencher com 2024 (ano base do download)
-    subset['ano'] = subset['ano'].fillna(2024).astype(int)
-    subset['trimestre'] = subset['trimestre'].fillna(4).astype(int)
-
-    # 5. Cálculo de Gasto Real
-    subset = get_desacumulado(subset)
-
     # 6. Rankings
     periods = subset[['ano','trimestre']].drop_duplicates().sort_values(['ano','trimestre'], ascending=False)
     last_ano, last_tri = periods.iloc[0]['ano'], periods.iloc[0]['trimestre']
@@ -143,10 +144,16 @@ def main():
     print('='*70)
     print(res_y[['reg_ans', 'Razao Social', 'valor_real']].to_string(index=False))
 
-    # 9. Salva Consolidado
-    out_path = Path(INTERIM_DIR) / 'demo_consolidado_normalized.csv'
-    df.to_csv(out_path, index=False, encoding='utf-8-sig')
-    logging.info(f'CSV final normalizado salvo em: {out_path}')
+    # 9. Salva Consolidado (CSV para compatibilidade e/ou Parquet particionado)
+    formats = output_formats()
+    if 'csv' in formats:
+        out_path = Path(INTERIM_DIR) / 'demo_consolidado_normalized.csv'
+        df.to_csv(out_path, index=False, encoding='utf-8-sig')
+        logging.info(f'CSV final normalizado salvo em: {out_path}')
+    if 'parquet' in formats:
+        out_path = Path(INTERIM_DIR) / 'demo_consolidado_normalized.parquet'
+        save_parquet_dataset(df, out_path)
+        logging.info(f'Parquet final normalizado salvo em: {out_path}')
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,107 @@
+import os
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import pandas as pd
+
+from etl.transform.desacumulado import desacumular
+
+# Cubo trimestral: uma linha por (ano, trimestre, reg_ans, cd_conta_contabil) com o saldo
+# acumulado no ano e o valor do trimestre, para todas as contas e operadoras.
+CUBO_PATH = Path(__file__).parent.parent / "data" / "interim" / "cubo_trimestral.parquet"
+
+CUBO_KEYS = ["ano", "trimestre", "cd_conta_contabil", "reg_ans"]
+CUBO_COLUMNS = CUBO_KEYS + ["descricao_conta", "vl_acumulado", "valor_real", "lacuna"]
+CUBO_DTYPES = {
+    "ano": "int16",
+    "trimestre": "int8",
+    "cd_conta_contabil": "category",
+    "reg_ans": "category",
+    "descricao_conta": "category",
+    "vl_acumulado": "float64",
+    "valor_real": "float64",
+    "lacuna": "bool",
+}
+
+# Categoria assistencial dos rankings padrão (eventos/sinistros médico-hospitalares)
+TERMOS_SINISTROS_HOSPITALARES = ("SINISTROS CONHECIDOS", "HOSPITALAR")
+
+
+def _has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def build_cubo(df: pd.DataFrame, valor: str = "vl_saldo_final_num") -> pd.DataFrame:
+    """Agrega o consolidado (já com `valor` numérico) no cubo trimestral.
+
+    Linhas sem ano, trimestre, operadora ou conta são descartadas. O cubo sai ordenado
+    por (ano, trimestre, conta, operadora): cada período, e cada conta dentro dele, é
+    um intervalo contíguo de linhas.
+    """
+    base = df[["ano", "trimestre", "reg_ans", "cd_conta_contabil", "descricao_conta", valor]].copy()
+    base["ano"] = pd.to_numeric(base["ano"], errors="coerce")
+    base["trimestre"] = pd.to_numeric(base["trimestre"], errors="coerce")
+    base = base.dropna(subset=["ano", "trimestre", "reg_ans", "cd_conta_contabil"])
+    base["reg_ans"] = base["reg_ans"].astype(str)
+    base["cd_conta_contabil"] = base["cd_conta_contabil"].astype(str)
+
+    cubo = desacumular(base, chaves=["reg_ans", "cd_conta_contabil"], valor=valor)
+    cubo = cubo.rename(columns={valor: "vl_acumulado"})
+
+    # Descrição da conta: a primeira vista para cada código
+    descricoes = base.groupby("cd_conta_contabil", sort=False)["descricao_conta"].first()
+    cubo["descricao_conta"] = cubo["cd_conta_contabil"].map(descricoes)
+
+    cubo = cubo[CUBO_COLUMNS].astype(CUBO_DTYPES)
+    return cubo.sort_values(CUBO_KEYS, kind="stable").reset_index(drop=True)
+
+
+def save_cubo(cubo: pd.DataFrame, path: Path = CUBO_PATH) -> Path:
+    """Grava o cubo em Parquet (ou CSV ao lado, sem pyarrow) com troca atômica do arquivo."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if not _has_pyarrow():
+        path = path.with_suffix(".csv")
+    tmp = path.with_name(path.name + ".tmp")
+    if path.suffix == ".parquet":
+        cubo.to_parquet(tmp, engine="pyarrow", index=False)
+    else:
+        cubo.to_csv(tmp, index=False, encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def cubo_file(path: Path = CUBO_PATH) -> Optional[Path]:
+    """Arquivo do cubo existente: o Parquet ou, na falta dele, o CSV irmão."""
+    for candidate in (path, path.with_suffix(".csv")):
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def load_cubo(path: Path = CUBO_PATH) -> pd.DataFrame:
+    source = cubo_file(path)
+    if source is None:
+        raise FileNotFoundError(f"Cubo trimestral não encontrado: {path}")
+    if source.suffix == ".parquet":
+        cubo = pd.read_parquet(source, engine="pyarrow")
+    else:
+        cubo = pd.read_csv(source, dtype={"reg_ans": str, "cd_conta_contabil": str, "descricao_conta": str})
+    return cubo[CUBO_COLUMNS].astype(CUBO_DTYPES)
+
+
+def contas_por_descricao(
+    descricoes: pd.Series, termos: Sequence[str] = TERMOS_SINISTROS_HOSPITALARES
+) -> List[str]:
+    """Códigos de conta cuja descrição contém todos os `termos` (sem diferenciar caixa).
+
+    `descricoes` é indexada pelo código da conta (uma linha por conta).
+    """
+    texto = descricoes.astype(str).str.strip().str.upper()
+    mask = pd.Series(True, index=descricoes.index)
+    for termo in termos:
+        mask &= texto.str.contains(termo.upper(), regex=False)
+    return sorted(str(c) for c in descricoes.index[mask.to_numpy()])
@@ -0,0 +1,93 @@
+from typing import Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# As demonstrações trazem o saldo acumulado no ano: o 1º trimestre já é o valor do
+# período e os demais precisam do trimestre imediatamente anterior do mesmo ano.
+TRIMESTRES_POR_ANO = 4
+CHAVES_PADRAO = ("reg_ans", "cd_conta_contabil")
+
+
+def _codigos_das_chaves(df: pd.DataFrame, chaves: Sequence[str]) -> Tuple[np.ndarray, pd.DataFrame]:
+    """Código denso (0..G-1, na ordem das chaves) de cada linha e os valores de cada grupo."""
+    codigos, uniques = [], []
+    for chave in chaves:
+        c, u = pd.factorize(df[chave], sort=True)
+        if (c < 0).any():
+            raise ValueError(f"Coluna '{chave}' tem valores ausentes")
+        codigos.append(c)
+        uniques.append(u)
+
+    shape = tuple(len(u) for u in uniques)
+    combinado = np.ravel_multi_index(codigos, shape) if len(chaves) > 1 else codigos[0]
+    grupo, combinados = pd.factorize(combinado, sort=True)
+
+    partes = np.unravel_index(combinados, shape)
+    valores = pd.DataFrame({chave: u.take(p) for chave, u, p in zip(chaves, uniques, partes)})
+    return grupo, valores
+
+
+def desacumular(
+    df: pd.DataFrame,
+    chaves: Sequence[str] = CHAVES_PADRAO,
+    valor: str = "vl_saldo_final_num",
+) -> pd.DataFrame:
+    """Valor de cada trimestre a partir dos saldos acumulados no ano, para todas as contas.
+
+    Monta uma matriz densa (grupo x trimestre) com NumPy, onde grupo é a combinação de
+    `chaves` (por padrão operadora x conta contábil), e calcula as diferenças entre
+    colunas vizinhas de uma vez. Devolve uma linha por (chaves, ano, trimestre) presente,
+    ordenada, com:
+
+    - `valor`: saldo acumulado (linhas repetidas na mesma célula são somadas);
+    - `valor_real`: valor do trimestre (o próprio acumulado no 1º trimestre);
+    - `lacuna`: True quando falta o trimestre anterior do mesmo ano. Nesse caso o
+      valor do trimestre não pode ser calculado e `valor_real` fica NaN, em vez de
+      subtrair um trimestre mais antigo.
+
+    `ano` e `trimestre` precisam ser inteiros, com trimestre entre 1 e 4.
+    """
+    chaves = list(chaves)
+    colunas = chaves + ["ano", "trimestre", valor]
+    if df.empty:
+        return pd.DataFrame(columns=colunas + ["valor_real", "lacuna"])
+
+    ano = df["ano"].to_numpy(dtype=np.int64)
+    trimestre = df["trimestre"].to_numpy(dtype=np.int64)
+    if ((trimestre < 1) | (trimestre > TRIMESTRES_POR_ANO)).any():
+        raise ValueError("trimestre fora do intervalo 1-4")
+
+    grupo, valores_chaves = _codigos_das_chaves(df, chaves)
+    ano_min = int(ano.min())
+    periodo = (ano - ano_min) * TRIMESTRES_POR_ANO + (trimestre - 1)
+    n_grupos = len(valores_chaves)
+    n_periodos = int(periodo.max()) + 1
+
+    # Soma por célula e presença via bincount no índice achatado (sem laço em Python)
+    celula = grupo * n_periodos + periodo
+    tamanho = n_grupos * n_periodos
+    acumulado = np.bincount(celula, weights=df[valor].to_numpy(dtype=np.float64), minlength=tamanho)
+    presente = np.bincount(celula, minlength=tamanho) > 0
+    acumulado = acumulado.reshape(n_grupos, n_periodos)
+    presente = presente.reshape(n_grupos, n_periodos)
+
+    # Trimestre anterior = coluna vizinha à esquerda; o 1º trimestre não subtrai nada
+    anterior = np.zeros_like(acumulado)
+    anterior[:, 1:] = acumulado[:, :-1]
+    tem_anterior = np.zeros_like(presente)
+    tem_anterior[:, 1:] = presente[:, :-1]
+    primeiro = (np.arange(n_periodos) % TRIMESTRES_POR_ANO) == 0
+
+    lacuna = presente & ~tem_anterior & ~primeiro
+    real = np.where(primeiro, acumulado, acumulado - anterior)
+    real[lacuna] = np.nan
+
+    g, p = np.nonzero(presente)
+    out = valores_chaves.take(g).reset_index(drop=True)
+    out["ano"] = ano_min + p // TRIMESTRES_POR_ANO
+    out["trimestre"] = p % TRIMESTRES_POR_ANO + 1
+    out[valor] = acumulado[g, p]
+    out["valor_real"] = real[g, p]
+    out["lacuna"] = lacuna[g, p]
+    return out
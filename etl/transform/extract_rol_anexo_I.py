@@ -1,6 +1,10 @@
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 import pandas as pd
 import tabula
 import logging
@@ -9,7 +13,8 @@ import logging
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 
 # Importações internas
-from etl.transform.map_abbreviations import extract_od_amb_legend, replace_od_amb_values
+from etl.transform.map_abbreviations import OD_AMB_COLUMNS, extract_od_amb_legend, map_od_amb_categorical
+from etl.transform.pdf_document import PdfDocument
 from etl.transform.to_csv_and_zip import save_csv, zip_file
 
 # --- CONFIGURAÇÃO DE CAMINHOS ROBUSTA ---
@@ -25,67 +30,286 @@ PROCESSED_DIR = PROJECT_ROOT / 'data' / 'processed'
 _USER_NAME = os.getenv('ANS_TESTE_NOME', 'resultadofinal')
 OUTPUT_ZIP = PROCESSED_DIR / f'Teste_{_USER_NAME}.zip'
 
+# O PDF é lido em blocos de páginas, cada um com seu próprio fallback lattice -> stream
+DEFAULT_PAGES_PER_CHUNK = 25
+
+# Cache endereçado pelo conteúdo de cada página: <versão>/<sha256>.<modo>.pkl.gz com as tabelas
+# brutas da página em cada modo do Tabula (lattice; stream só quando o bloco precisa do fallback).
+# Mudar a forma de extração (parâmetros do Tabula) exige trocar a versão.
+PAGE_CACHE_DIR = INTERIM_DIR / 'rol_paginas_cache'
+PAGE_CACHE_VERSION = 'tabula-lattice-stream-v3'
+
+# Opções do Tabula em cada modo de extração
+TABULA_MODES = {
+    'lattice': dict(encoding='latin-1', lattice=True, silent=True),
+    'stream': dict(stream=True),
+}
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+def _page_chunks(n_pages: int, pages_per_chunk: int) -> List[Tuple[int, int]]:
+    """Intervalos (inicio, fim), 1-based e inclusivos, cobrindo todas as páginas em ordem."""
+    return [(start, min(start + pages_per_chunk - 1, n_pages)) for start in range(1, n_pages + 1, pages_per_chunk)]
+
+def _extrair_bloco(args: Tuple[str, Tuple[int, int]]) -> List[pd.DataFrame]:
+    """Extrai as tabelas de um intervalo de páginas (executa em processo separado).
+
+    Se o modo lattice não encontrar nada no intervalo, só esse intervalo é relido em modo stream.
+    """
+    pdf_path, (start, end) = args
+    pages = f"{start}-{end}"
+
+    # O segredo aqui é não passar nenhum parâmetro que ative o JPype
+    # O Tabula usará o comando 'java -jar' do sistema operacional
+    tables = _tabelas_por_pagina(pdf_path, pages, **TABULA_MODES['lattice'])
+
+    if not any(tables.values()):
+        logging.warning(f"Modo lattice não retornou dados nas páginas {pages}. Tentando modo stream.")
+        tables = _tabelas_por_pagina(pdf_path, pages, **TABULA_MODES['stream'])
+
+    return [table for page in sorted(tables) for table in tables[page]]
+
+def _run_jobs(jobs: list, workers: int, extrair=_extrair_bloco) -> list:
+    """Executa `extrair` (por padrão `_extrair_bloco`) para cada job, na ordem, em série ou em processos paralelos."""
+    if workers <= 1 or len(jobs) <= 1:
+        return [extrair(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        return list(pool.map(extrair, jobs))
+
+def _page_runs(pages: List[int], pages_per_chunk: int) -> List[Tuple[int, int]]:
+    """Agrupa páginas (ordenadas) em intervalos contíguos de até `pages_per_chunk` páginas."""
+    runs: List[Tuple[int, int]] = []
+    for page in pages:
+        if runs and page == runs[-1][1] + 1 and page - runs[-1][0] < pages_per_chunk:
+            runs[-1] = (runs[-1][0], page)
+        else:
+            runs.append((page, page))
+    return runs
+
+def _tabelas_do_json(raw_tables: list) -> List[pd.DataFrame]:
+    """DataFrames das tabelas na saída JSON do tabula-java, como o `read_pdf` do tabula-py monta.
+
+    A primeira linha é o cabeçalho (vazios viram "Unnamed: i", repetidos ganham ".n"),
+    células vazias viram NaN e colunas inteiramente numéricas são convertidas.
+    """
+    frames = []
+    for table in raw_tables:
+        rows = [[cell.get('text') or np.nan for cell in row] for row in table.get('data', [])]
+        if not rows:
+            continue
+
+        columns, seen, unnamed = [], {}, 0
+        for col in rows[0]:
+            if not isinstance(col, str):
+                col = f'Unnamed: {unnamed}'
+                unnamed += 1
+            count = seen.get(col, 0)
+            seen[col] = count + 1
+            columns.append(col if count == 0 else f'{col}.{count}')
+
+        df = pd.DataFrame(rows[1:], columns=columns)
+        for c in df.columns:
+            try:
+                df[c] = pd.to_numeric(df[c], errors='raise')
+            except (ValueError, TypeError):
+                pass
+        frames.append(df)
+    return frames
+
+def _tabelas_por_pagina(pdf_path: str, pages: str, **options) -> Dict[int, List[pd.DataFrame]]:
+    """Uma chamada ao Tabula para `pages`, com as tabelas separadas pela página de origem.
+
+    Usa a saída JSON do tabula-java, que traz o número da página de cada tabela, e monta
+    os DataFrames aqui (`_tabelas_do_json`) em vez de depender da conversão interna do tabula-py.
+    """
+    raw = tabula.read_pdf(pdf_path, pages=pages, output_format='json', **options) or []
+    by_page: Dict[int, list] = {}
+    for table in raw:
+        by_page.setdefault(int(table['page_number']), []).append(table)
+    return {page: _tabelas_do_json(tables) for page, tables in by_page.items()}
+
+def _extrair_paginas(args: Tuple[str, Tuple[int, int], str]) -> Dict[int, List[pd.DataFrame]]:
+    """Extrai um intervalo de páginas num modo do Tabula e devolve as tabelas de cada página
+    (executa em processo separado)."""
+    pdf_path, (start, end), mode = args
+    tables = _tabelas_por_pagina(pdf_path, f"{start}-{end}", **TABULA_MODES[mode])
+    return {page: tables.get(page, []) for page in range(start, end + 1)}
+
+def _tabelas_em_cache(
+    doc: PdfDocument, hashes: List[str], pages: List[int], mode: str,
+    workers: int, cache_dir: Path, pages_per_chunk: int,
+) -> Dict[int, List[pd.DataFrame]]:
+    """Tabelas de `pages` no modo `mode`, extraindo com o Tabula só as ausentes do cache.
+
+    As páginas ausentes são agrupadas em intervalos contíguos de até `pages_per_chunk`
+    páginas, com uma chamada ao Tabula por intervalo. Páginas com conteúdo idêntico
+    compartilham a mesma entrada; cada hash é extraído uma vez.
+    """
+    def entry(page_no: int) -> Path:
+        return cache_dir / f'{hashes[page_no - 1]}.{mode}.pkl.gz'
+
+    missing = {}
+    for page_no in pages:
+        if hashes[page_no - 1] not in missing and not entry(page_no).exists():
+            missing[hashes[page_no - 1]] = page_no
+
+    jobs = [(str(doc.path), run, mode) for run in _page_runs(sorted(missing.values()), pages_per_chunk)]
+    logging.info(f"Cache de páginas ({mode}): {len(pages) - len(missing)} de {len(pages)} páginas reaproveitadas; "
+                 f"{len(missing)} a extrair em {len(jobs)} bloco(s) ({workers} worker(s)).")
+
+    for by_page in _run_jobs(jobs, workers, _extrair_paginas):
+        for page_no, tables in by_page.items():
+            target = entry(page_no)
+            tmp = target.with_name(target.name + '.tmp')
+            pd.to_pickle(tables, tmp, compression='gzip')
+            os.replace(tmp, target)
+
+    return {page_no: pd.read_pickle(entry(page_no), compression='gzip') for page_no in pages}
+
+def _extrair_com_cache(doc: PdfDocument, workers: int, cache_dir: Path, pages_per_chunk: int) -> List[List[pd.DataFrame]]:
+    """Tabelas por bloco de páginas, como `_extrair_bloco`, mas com cache por página.
+
+    O resultado lattice de cada página fica no cache; o fallback continua sendo por bloco
+    (`_page_chunks`): só os blocos sem nenhuma tabela lattice usam o modo stream, com as
+    tabelas stream de cada página também em cache. A saída é a mesma da extração sem cache
+    com o mesmo `pages_per_chunk`.
+    """
+    cache_dir = cache_dir / PAGE_CACHE_VERSION
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    hashes = doc.page_hashes()
+    chunks = _page_chunks(len(hashes), pages_per_chunk)
+
+    lattice = _tabelas_em_cache(doc, hashes, list(range(1, len(hashes) + 1)), 'lattice',
+                                workers, cache_dir, pages_per_chunk)
+    sem_lattice = [(start, end) for start, end in chunks
+                   if not any(lattice[page] for page in range(start, end + 1))]
+    for start, end in sem_lattice:
+        logging.warning(f"Modo lattice não retornou dados nas páginas {start}-{end}. Usando modo stream.")
+    stream = _tabelas_em_cache(doc, hashes, [p for start, end in sem_lattice for p in range(start, end + 1)],
+                               'stream', workers, cache_dir, pages_per_chunk) if sem_lattice else {}
+
+    return [
+        [table for page in range(start, end + 1)
+         for table in (stream if (start, end) in sem_lattice else lattice)[page]]
+        for start, end in chunks
+    ]
+
+def extrair_tabelas_brutas(
+    doc: PdfDocument,
+    workers: Optional[int] = None,
+    pages_per_chunk: Optional[int] = None,
+    cache_dir: Optional[Path] = None,
+) -> List[pd.DataFrame]:
+    """Tabelas do PDF na ordem das páginas, extraídas por blocos de páginas.
+
+    Com `workers > 1` os blocos rodam em paralelo (cada processo com sua própria JVM);
+    o resultado é idêntico ao da execução serial porque `map` preserva a ordem dos blocos.
+    Com `cache_dir`, as tabelas são guardadas por página e só as páginas novas ou
+    alteradas passam pelo Tabula, também em blocos (ver `_extrair_com_cache`).
+    """
+    workers = workers or _env_int('ANS_ROL_WORKERS', 1)
+    pages_per_chunk = pages_per_chunk or _env_int('ANS_ROL_PAGES_PER_CHUNK', DEFAULT_PAGES_PER_CHUNK)
+
+    if cache_dir is not None:
+        per_chunk = _extrair_com_cache(doc, workers, cache_dir, pages_per_chunk)
+    else:
+        n_pages = len(doc)
+        jobs = [(str(doc.path), chunk) for chunk in _page_chunks(n_pages, pages_per_chunk)]
+        logging.info(f"{n_pages} páginas em {len(jobs)} blocos de até {pages_per_chunk} páginas ({workers} worker(s)).")
+        per_chunk = _run_jobs(jobs, workers)
+
+    return [table for tables in per_chunk for table in tables]
+
+COLUNA_MAP = {
+    r'c[oó]digo': 'codigo',
+    r'descri[cç][aã]o|procedimento': 'procedimento',
+    r'^od$': 'od',
+    r'^amb$': 'amb'
+}
+
+@lru_cache(maxsize=None)
+def _padronizar_cabecalho(colunas: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Cabeçalho padronizado; as centenas de tabelas do PDF repetem poucos cabeçalhos distintos."""
+    cols = [c.strip().replace('\n', ' ') for c in colunas]
+    for pattern, new_name in COLUNA_MAP.items():
+        match = [c for c in cols if re.search(pattern, c, re.IGNORECASE)]
+        if match:
+            cols = [new_name if c == match[0] else c for c in cols]
+    return tuple(cols)
+
 def limpar_e_padronizar_colunas(df):
     """Padroniza nomes de colunas e remove ruídos."""
-    df.columns = [str(c).strip().replace('\n', ' ') for c in df.columns]
-    
-    coluna_map = {
-        r'c[oó]digo': 'codigo',
-        r'descri[cç][aã]o|procedimento': 'procedimento',
-        r'^od$': 'od',
-        r'^amb$': 'amb'
-    }
-    
-    for pattern, new_name in coluna_map.items():
-        cols = [c for c in df.columns if re.search(pattern, c, re.IGNORECASE)]
-        if cols:
-            df = df.rename(columns={cols[0]: new_name})
+    df.columns = list(_padronizar_cabecalho(tuple(str(c) for c in df.columns)))
     return df
 
-def extrair_tabela_anexo_i(pdf_path):
-    """Extração via Tabula isolando o processo Java para evitar erros de biblioteca."""
+def pos_processar_tabelas(tables: List[pd.DataFrame], legenda_map) -> Optional[pd.DataFrame]:
+    """Junta as tabelas brutas e aplica a limpeza uma vez sobre o frame consolidado.
+
+    Equivale a limpar/padronizar/mapear cada tabela e concatenar no fim, mas o trabalho
+    por tabela se resume a trocar o cabeçalho; OD/AMB viram categorias.
+    """
+    frames = []
+    headers = set()
+    has_col = {c: [] for c in OD_AMB_COLUMNS}
+    for table in tables:
+        if table.empty: continue
+        df = limpar_e_padronizar_colunas(table.copy(deep=False))
+        headers.add(tuple(df.columns))
+        for c in OD_AMB_COLUMNS:
+            present = c in df.columns
+            # Mantém os valores como na tabela de origem (evita upcast int -> float no concat)
+            if present and df[c].dtype != object:
+                df[c] = df[c].astype(object)
+            has_col[c].append(np.full(len(df), present))
+        frames.append(df)
+
+    if not frames: return None
+    logging.info(f"{len(frames)} tabelas estruturadas ({len(headers)} cabeçalhos distintos).")
+
+    # Uma linha vazia na tabela de origem continua vazia no frame consolidado
+    df = pd.concat(frames, ignore_index=True).dropna(how='all')
+    rows = df.index.to_numpy()
+
+    present = {c: np.concatenate(has_col[c])[rows] for c in OD_AMB_COLUMNS if c in df.columns}
+    df = map_od_amb_categorical(df, legenda_map, present)
+    return df.drop_duplicates().reset_index(drop=True)
+
+def extrair_tabela_anexo_i(pdf_path, workers=None, pages_per_chunk=None, cache_dir=None):
+    """Extração via Tabula isolando o processo Java para evitar erros de biblioteca.
+
+    `workers`/`pages_per_chunk` controlam a extração paralela por blocos de páginas
+    (padrões: env ANS_ROL_WORKERS=1 e ANS_ROL_PAGES_PER_CHUNK=25); `cache_dir` ativa
+    o cache de tabelas por página.
+
+    O PDF é aberto uma única vez (`PdfDocument`) e compartilhado entre a busca da
+    legenda e a extração das tabelas; o Tabula só lê as páginas que precisa extrair.
+    """
     logging.info(f"Lendo PDF oficial: {pdf_path.name}")
+    try:
+        doc = PdfDocument(pdf_path)
+    except Exception as e:
+        logging.error(f"Não foi possível abrir o PDF: {e}")
+        return None
     
     try:
-        legenda_map = extract_od_amb_legend(str(pdf_path))
+        legenda_map = extract_od_amb_legend(doc)
     except:
         legenda_map = {"OD": "Odontológico", "AMB": "Ambulatorial"}
 
-    dfs = []
     try:
         logging.info("Iniciando extração via Java isolado... Isso levará alguns minutos.")
-        
-        # O segredo aqui é não passar nenhum parâmetro que ative o JPype
-        # O Tabula usará o comando 'java -jar' do sistema operacional
-        tables = tabula.read_pdf(
-            str(pdf_path), 
-            pages='all', 
-            multiple_tables=True, 
-            encoding='latin-1', 
-            lattice=True,
-            silent=True
-        )
-        
-        if not tables:
-            logging.warning("Modo lattice não retornou dados. Tentando modo stream.")
-            tables = tabula.read_pdf(str(pdf_path), pages='all', multiple_tables=True, stream=True)
-
-        for i, table in enumerate(tables):
-            if table.empty: continue
-            df = table.dropna(how='all')
-            df = limpar_e_padronizar_colunas(df)
-            df = replace_od_amb_values(df, legenda_map)
-            dfs.append(df)
-            if i % 20 == 0: logging.info(f"Progresso: {i} tabelas estruturadas...")
+        tables = extrair_tabelas_brutas(doc, workers=workers, pages_per_chunk=pages_per_chunk, cache_dir=cache_dir)
+        return pos_processar_tabelas(tables, legenda_map)
 
     except Exception as e:
         logging.error(f"Erro técnico na extração: {e}")
         logging.info("DICA: Certifique-se de que o comando 'java -version' funciona no seu terminal.")
         return None
 
-    if not dfs: return None
-    return pd.concat(dfs, ignore_index=True).drop_duplicates().reset_index(drop=True)
-
 def main():
     logging.info("=== Requisito 2: Transformação de Dados ===")
     
@@ -119,8 +343,9 @@ def main():
 
     logging.info(f"Arquivo selecionado para extração: {anexo_i_file.name}")
 
-    # 2. Execução da Extração
-    df = extrair_tabela_anexo_i(anexo_i_file)
+    # 2. Execução da Extração (ANS_ROL_CACHE=0 desativa o cache de páginas)
+    cache_dir = PAGE_CACHE_DIR if os.getenv('ANS_ROL_CACHE', '1') != '0' else None
+    df = extrair_tabela_anexo_i(anexo_i_file, cache_dir=cache_dir)
     
     if df is not None and not df.empty:
         # Requisito 2.2: Salvar em CSV estruturado
@@ -1,10 +1,16 @@
 import re
-from typing import Dict
+from typing import Dict, Union
 
-import pdfplumber
+import numpy as np
+import pandas as pd
 
+from etl.transform.pdf_document import PdfDocument
 
-def extract_od_amb_legend(pdf_path: str) -> Dict[str, str]:
+# Coluna normalizada -> abreviação usada na legenda
+OD_AMB_COLUMNS = {"od": "OD", "amb": "AMB"}
+
+
+def extract_od_amb_legend(pdf: Union[str, PdfDocument]) -> Dict[str, str]:
     """Extrai do PDF um mapa de abreviações para descrições.
 
     Objetivo: encontrar no rodapé/legenda algo como:
@@ -13,35 +19,37 @@ def extract_od_amb_legend(pdf_path: str) -> Dict[str, str]:
 
     Observação: o PDF do Anexo I pode variar ao longo do tempo. Por isso,
     a função tenta padrões comuns e, se falhar, retorna um fallback.
+
+    Aceita um `PdfDocument` já aberto (a extração de tabelas reaproveita o mesmo
+    documento) ou o caminho do arquivo.
     """
 
     legend: Dict[str, str] = {}
 
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            # Normalmente a legenda fica nas páginas finais, mas isso pode mudar.
-            # Varremos as últimas 5 páginas para ser mais robusto.
-            pages = pdf.pages[-5:] if len(pdf.pages) >= 5 else pdf.pages
-
-            for page in pages:
-                text = page.extract_text() or ""
-                if not text:
-                    continue
+        doc = pdf if isinstance(pdf, PdfDocument) else PdfDocument(pdf)
+
+        # Normalmente a legenda fica nas páginas finais, mas isso pode mudar.
+        # Varremos as últimas 5 páginas para ser mais robusto.
+        for index in range(max(0, len(doc) - 5), len(doc)):
+            text = doc.page_text(index)
+            if not text:
+                continue
 
-                # Normaliza espaços
-                text = re.sub(r"\s+", " ", text)
+            # Normaliza espaços
+            text = re.sub(r"\s+", " ", text)
 
-                # Padrões típicos: "OD - ..." / "OD: ..."
-                for abbr in ("OD", "AMB"):
-                    if abbr in legend:
-                        continue
+            # Padrões típicos: "OD - ..." / "OD: ..."
+            for abbr in ("OD", "AMB"):
+                if abbr in legend:
+                    continue
 
-                    m = re.search(rf"\b{abbr}\b\s*[-:]\s*([^.;\n]+)", text, flags=re.IGNORECASE)
-                    if m:
-                        legend[abbr] = m.group(1).strip()
+                m = re.search(rf"\b{abbr}\b\s*[-:]\s*([^.;\n]+)", text, flags=re.IGNORECASE)
+                if m:
+                    legend[abbr] = m.group(1).strip()
 
-                if "OD" in legend and "AMB" in legend:
-                    break
+            if "OD" in legend and "AMB" in legend:
+                break
 
     except Exception:
         # Mantém comportamento tolerante a falhas
@@ -67,3 +75,31 @@ def replace_od_amb_values(df, legend: Dict[str, str]):
         df["amb"] = df["amb"].fillna("").astype(str).replace({"AMB": legend["AMB"]})
 
     return df
+
+
+def map_od_amb_categorical(df: pd.DataFrame, legend: Dict[str, str], present: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """Versão em lote de `replace_od_amb_values` para o frame já consolidado.
+
+    `present[col]` marca as linhas vindas de tabelas que tinham a coluna: nelas o valor
+    vira texto ('' para nulos) e a abreviação é trocada pela descrição da legenda; nas
+    demais permanece nulo. O resultado é categórico e a troca é feita só nas categorias.
+    """
+    for col, abbr in OD_AMB_COLUMNS.items():
+        if col not in df.columns or col not in present:
+            continue
+
+        mask = present[col]
+        text = df[col][mask].fillna("").astype(str).astype("category")
+        categories = text.cat.categories
+        if abbr in legend:
+            categories = categories.map(lambda c: legend[abbr] if c == abbr else c)
+        if not categories.is_unique:
+            # A descrição já aparecia como valor: junta as duas categorias
+            text = text.astype(str).replace({abbr: legend[abbr]}).astype("category")
+            categories = text.cat.categories
+
+        codes = np.full(len(df), -1, dtype=np.int32)
+        codes[mask] = text.cat.codes.to_numpy()
+        df[col] = pd.Categorical.from_codes(codes, categories=categories)
+
+    return df
@@ -0,0 +1,54 @@
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from pypdf import PdfReader
+
+
+class PdfDocument:
+    """PDF aberto e interpretado uma única vez e compartilhado pelas etapas da extração.
+
+    A legenda (texto das páginas) e a extração de tabelas (contagem e hash das páginas)
+    consomem a mesma instância; texto e hashes são calculados sob demanda e memorizados.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._reader = PdfReader(str(self.path))
+        self._text: Dict[int, str] = {}
+        self._hashes: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self._reader.pages)
+
+    def page_text(self, index: int) -> str:
+        """Texto da página `index` (0-based; aceita índices negativos)."""
+        index = range(len(self))[index]
+        if index not in self._text:
+            self._text[index] = self._reader.pages[index].extract_text() or ""
+        return self._text[index]
+
+    def page_hashes(self) -> List[str]:
+        """sha256 do conteúdo de cada página (operadores de desenho, fontes, dimensões e rotação).
+
+        Independe da posição da página e dos metadados do arquivo: uma emenda que insere
+        páginas ou republica o PDF só muda o hash das páginas cujo conteúdo mudou.
+        """
+        if self._hashes is None:
+            self._hashes = [self._page_hash(page) for page in self._reader.pages]
+        return self._hashes
+
+    @staticmethod
+    def _page_hash(page) -> str:
+        h = hashlib.sha256()
+        contents = page.get_contents()
+        h.update(contents.get_data() if contents is not None else b"")
+        h.update(repr(([float(v) for v in page.mediabox], page.rotation)).encode())
+
+        resources = page.get("/Resources")
+        fonts = resources.get_object().get("/Font") if resources is not None else None
+        if fonts is not None:
+            fonts = fonts.get_object()
+            for name in sorted(fonts):
+                h.update(f"{name}={fonts[name].get_object().get('/BaseFont')}".encode())
+        return h.hexdigest()
@@ -1,12 +1,20 @@
+import csv
+import hashlib
+import json
 import os
 import re
+import shutil
 import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, Optional, Tuple
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional, Tuple
 
 import pandas as pd
 
+from etl.transform.to_parquet import SUCCESS_MARKER, save_parquet_dataset
+
 
 RAW_DIR = Path(__file__).parent.parent / "data" / "raw"
 INTERIM_DIR = Path(__file__).parent.parent / "data" / "interim"
@@ -15,6 +23,32 @@ ZIPS_ROOT = RAW_DIR / "demonstracoes_contabeis"
 EXTRACTED_ROOT = RAW_DIR / "demonstracoes_contabeis_extracted"
 OUT_CSV = INTERIM_DIR / "demonstracoes_contabeis_consolidado.csv"
 OUT_VALIDATION_CSV = INTERIM_DIR / "validacao_demonstracoes_contabeis.csv"
+OUT_PARQUET = INTERIM_DIR / "demonstracoes_contabeis_consolidado.parquet"
+
+CSV_ENCODINGS = ["utf-8-sig", "utf-8", "latin1"]
+
+# Amostra do início do arquivo usada para detectar encoding/separador/aspas
+SNIFF_SAMPLE_BYTES = 64 * 1024
+
+# Marca gravada na pasta extraída com a assinatura do ZIP de origem
+EXTRACTED_MARKER = ".extraido_de"
+
+# Consolidação incremental: manifesto dos ZIPs + saída normalizada por trimestre
+MANIFEST_PATH = INTERIM_DIR / "demonstracoes_manifest.json"
+QUARTERS_DIR = INTERIM_DIR / "demonstracoes_por_trimestre"
+
+NORMALIZED_COLUMNS = [
+    "ano",
+    "trimestre",
+    "reg_ans",
+    "cd_conta_contabil",
+    "descricao_conta",
+    "vl_saldo_inicial",
+    "vl_saldo_final",
+]
+
+# Formato das saídas consolidadas: "csv" (padrão), "parquet" ou "both"
+OUTPUT_FORMATS = {"csv": {"csv"}, "parquet": {"parquet"}, "both": {"csv", "parquet"}}
 
 
 @dataclass(frozen=True)
@@ -23,11 +57,44 @@ class Periodo:
     trimestre: int
 
 
+@dataclass(frozen=True)
+class CsvSource:
+    """Um CSV trimestral: arquivo em disco ou membro `member` dentro do ZIP `path`."""
+
+    path: Path
+    member: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return Path(self.member).name if self.member else self.path.name
+
+    @contextmanager
+    def open(self) -> Iterator[BinaryIO]:
+        if self.member is None:
+            with open(self.path, "rb") as f:
+                yield f
+        else:
+            # Descompacta sob demanda, sem passar pelo disco
+            with zipfile.ZipFile(self.path, "r") as zf, zf.open(self.member) as f:
+                yield f
+
+    def __str__(self) -> str:
+        return f"{self.path}!{self.member}" if self.member else str(self.path)
+
+
 def _ensure_dirs() -> None:
     INTERIM_DIR.mkdir(parents=True, exist_ok=True)
     EXTRACTED_ROOT.mkdir(parents=True, exist_ok=True)
 
 
+def output_formats() -> set[str]:
+    fmt = os.getenv("ANS_DEMO_OUTPUT_FORMAT", "csv").strip().lower()
+    if fmt not in OUTPUT_FORMATS:
+        print(f"ANS_DEMO_OUTPUT_FORMAT inválido ({fmt!r}); usando csv")
+        fmt = "csv"
+    return OUTPUT_FORMATS[fmt]
+
+
 def _parse_period_from_zip_name(zip_name: str) -> Optional[Periodo]:
     # Exemplos vistos no FTP: 1T2024.zip, 4T2024.zip, 2T2025.zip
     m = re.search(r"([1-4])T(20\d{2})", zip_name.upper())
@@ -39,52 +106,95 @@ def _parse_period_from_zip_name(zip_name: str) -> Optional[Periodo]:
     return Periodo(ano=ano, trimestre=trimestre)
 
 
-def extract_all_zips() -> list[Tuple[Path, Periodo]]:
-    """Descompacta todos os ZIPs encontrados em etl/data/raw/demonstracoes_contabeis/**."""
-
-    _ensure_dirs()
+def list_zips() -> list[Tuple[Path, Periodo]]:
+    """Lista os ZIPs trimestrais de etl/data/raw/demonstracoes_contabeis/** com seus períodos."""
 
-    extracted: list[Tuple[Path, Periodo]] = []
+    zips: list[Tuple[Path, Periodo]] = []
 
     if not ZIPS_ROOT.exists():
         print(f"Pasta não encontrada: {ZIPS_ROOT}")
-        return extracted
+        return zips
 
     zip_files = sorted(ZIPS_ROOT.glob("**/*.zip"))
     if not zip_files:
         print(f"Nenhum ZIP encontrado em: {ZIPS_ROOT}")
-        return extracted
+        return zips
 
     for z in zip_files:
         periodo = _parse_period_from_zip_name(z.name)
         if not periodo:
             print(f"Ignorando ZIP (não reconheci período no nome): {z.name}")
             continue
+        zips.append((z, periodo))
+
+    return zips
+
+
+def _zip_signature(zip_path: Path) -> str:
+    st = zip_path.stat()
+    return f"{zip_path.name}|{st.st_size}|{st.st_mtime_ns}"
+
 
-        out_dir = EXTRACTED_ROOT / str(periodo.ano) / f"{periodo.trimestre}T"
-        out_dir.mkdir(parents=True, exist_ok=True)
+def extract_all_zips() -> list[Tuple[Path, Periodo]]:
+    """Descompacta todos os ZIPs encontrados em etl/data/raw/demonstracoes_contabeis/**.
+
+    ZIPs inalterados (mesmo tamanho/mtime da última extração) não são descompactados de novo.
+    """
+
+    _ensure_dirs()
+
+    extracted: list[Tuple[Path, Periodo]] = []
 
+    for z, periodo in list_zips():
+        extracted.append((_extract_zip(z, periodo), periodo))
+
+    return extracted
+
+
+def _extract_zip(z: Path, periodo: Periodo) -> Path:
+    out_dir = EXTRACTED_ROOT / str(periodo.ano) / f"{periodo.trimestre}T"
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    marker = out_dir / EXTRACTED_MARKER
+    signature = _zip_signature(z)
+    if marker.exists() and marker.read_text(encoding="utf-8") == signature:
+        print(f"ZIP inalterado, reaproveitando extração: {z.name}")
+    else:
         print(f"Extraindo {z} -> {out_dir}")
         with zipfile.ZipFile(z, "r") as zf:
             zf.extractall(out_dir)
+        marker.write_text(signature, encoding="utf-8")
 
-        extracted.append((out_dir, periodo))
+    return out_dir
+
+
+def stream_zips_enabled() -> bool:
+    return os.getenv("ANS_STREAM_ZIPS", "1").strip().lower() not in ("0", "false", "no")
 
-    return extracted
 
+def collect_sources(stream: Optional[bool] = None) -> list[Tuple[Path, Periodo]]:
+    """Entradas para consolidate_demonstracoes.
 
-def _try_read_csv(path: Path) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+    No modo streaming (padrão; ANS_STREAM_ZIPS=0 desativa) devolve os próprios ZIPs, cujos
+    membros .csv são lidos direto do arquivo compactado. Caso contrário, extrai para disco.
+    """
+
+    if stream is None:
+        stream = stream_zips_enabled()
+    return list_zips() if stream else extract_all_zips()
+
+
+def _try_read_csv(source: CsvSource) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
     """Lê CSV tentando encodings comuns e separador automático.
 
     Retorna (df, encoding_usado).
     """
 
-    encodings = ["utf-8-sig", "utf-8", "latin1"]
-
-    for enc in encodings:
+    for enc in CSV_ENCODINGS:
         try:
             # sep=None + engine=python tenta inferir separador
-            df = pd.read_csv(path, sep=None, engine="python", encoding=enc, dtype=str)
+            with source.open() as f:
+                df = pd.read_csv(f, sep=None, engine="python", encoding=enc, dtype=str)
             return df, enc
         except Exception:
             continue
@@ -137,7 +247,7 @@ def _normalize_demonstracoes_schema(df: pd.DataFrame, periodo: Periodo) -> Optio
     if not cd_conta_col or not desc_col:
         return None
 
-    out = pd.DataFrame()
+    out = pd.DataFrame(index=df.index)
     out["ano"] = str(periodo.ano)
     out["trimestre"] = str(periodo.trimestre)
 
@@ -178,80 +288,201 @@ def _detect_columns_for_audit(df: pd.DataFrame) -> Dict[str, Optional[str]]:
     }
 
 
-def consolidate_demonstracoes(extracted: list[Tuple[Path, Periodo]]) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    """Percorre arquivos extraídos e gera um DataFrame consolidado + relatório de validação."""
+def _sniff_dialect(source: CsvSource, sample_bytes: int = SNIFF_SAMPLE_BYTES) -> Optional[Dict[str, str]]:
+    """Detecta encoding, separador e aspas a partir de uma amostra limitada do início do arquivo."""
+
+    with source.open() as f:
+        head = f.read(sample_bytes)
+    if not head:
+        return None
 
-    dfs: list[pd.DataFrame] = []
-    audit_rows: list[dict] = []
+    # Corta na última quebra de linha para não partir uma linha (ou um caractere multibyte)
+    if len(head) == sample_bytes and b"\n" in head:
+        head = head[: head.rfind(b"\n")]
 
-    for folder, periodo in extracted:
-        csv_files = sorted(folder.glob("**/*.csv"))
-        if not csv_files:
-            print(f"Nenhum CSV encontrado em {folder}")
+    for enc in CSV_ENCODINGS:
+        try:
+            sample = head.decode(enc)
+        except UnicodeDecodeError:
             continue
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=";,\t|")
+        except csv.Error:
+            return None
+        return {"encoding": enc, "sep": dialect.delimiter, "quotechar": dialect.quotechar or '"'}
+
+    return None
+
 
-        for csv_path in csv_files:
-            df_raw, encoding_used = _try_read_csv(csv_path)
-            if df_raw is None:
-                print(f"Falha ao ler CSV (encoding/separador): {csv_path}")
-                audit_rows.append({
-                    "arquivo": str(csv_path),
-                    "ano": periodo.ano,
-                    "trimestre": periodo.trimestre,
-                    "status": "read_error",
-                    "encoding": None,
-                    "linhas_raw": None,
-                    "colunas_raw": None,
-                    "linhas_normalizadas": None,
-                    "det_reg_ans_col": None,
-                    "det_cd_conta_contabil_col": None,
-                    "det_descricao_conta_col": None,
-                    "det_vl_saldo_inicial_col": None,
-                    "det_vl_saldo_final_col": None,
-                })
-                continue
-
-            detected = _detect_columns_for_audit(df_raw)
-            df_norm = _normalize_demonstracoes_schema(df_raw, periodo)
-            if df_norm is None:
-                # Provavelmente não é o CSV de demonstrativos (pode ser dicionário, etc.)
-                audit_rows.append({
-                    "arquivo": str(csv_path),
-                    "ano": periodo.ano,
-                    "trimestre": periodo.trimestre,
-                    "status": "skipped_not_matching_schema",
-                    "encoding": encoding_used,
-                    "linhas_raw": int(df_raw.shape[0]),
-                    "colunas_raw": int(df_raw.shape[1]),
-                    "linhas_normalizadas": None,
-                    **detected,
-                })
-                continue
-
-            print(f"OK: {csv_path.name} -> {df_norm.shape}")
-            dfs.append(df_norm)
-            audit_rows.append({
-                "arquivo": str(csv_path),
-                "ano": periodo.ano,
-                "trimestre": periodo.trimestre,
-                "status": "ok",
-                "encoding": encoding_used,
-                "linhas_raw": int(df_raw.shape[0]),
-                "colunas_raw": int(df_raw.shape[1]),
-                "linhas_normalizadas": int(df_norm.shape[0]),
-                **detected,
-            })
+def _read_csv_fast(source: CsvSource) -> Tuple[Optional[pd.DataFrame], Optional[Dict[str, Any]]]:
+    """Caminho rápido: dialeto pela amostra + um único parse completo com o engine C.
+
+    Só as colunas que o schema normalizado usa são materializadas (usecols). O encoding
+    vem da amostra; se um byte depois dela não decodificar, o parse C é refeito com o
+    próximo encoding candidato (latin1 decodifica qualquer byte).
+    Retorna (None, None) se a detecção ou o parse falharem.
+    """
+
+    dialect = _sniff_dialect(source)
+    if dialect is None:
+        return None, None
+
+    # Se um encoding UTF-8 falhou no arquivo inteiro, a outra variante UTF-8 também falharia
+    encodings = [dialect["encoding"]] + [
+        enc for enc in CSV_ENCODINGS if not enc.startswith("utf-8") and enc != dialect["encoding"]
+    ]
+    for enc in encodings:
+        opts = {"sep": dialect["sep"], "quotechar": dialect["quotechar"], "encoding": enc, "engine": "c"}
+        try:
+            with source.open() as f:
+                header = pd.read_csv(f, nrows=0, **opts)
+            detected = _detect_columns_for_audit(header)
+
+            usecols = None
+            if detected["det_cd_conta_contabil_col"] and detected["det_descricao_conta_col"]:
+                usecols = list(dict.fromkeys(c for c in detected.values() if c))
+
+            with source.open() as f:
+                df = pd.read_csv(f, dtype=str, usecols=usecols, **opts)
+        except UnicodeDecodeError:
+            continue
+        except (ValueError, pd.errors.ParserError):
+            return None, None
+
+        return df, {**dialect, "encoding": enc, "leitura": "c_sniff", "colunas_raw": int(header.shape[1])}
+
+    return None, None
+
+
+def _read_quarterly_csv(source: CsvSource) -> Tuple[Optional[pd.DataFrame], Dict[str, Any]]:
+    """Tenta o caminho rápido e, se a detecção falhar, cai no leitor antigo (_try_read_csv)."""
+
+    df, info = _read_csv_fast(source)
+    if df is not None:
+        return df, info
+
+    df, enc = _try_read_csv(source)
+    if df is None:
+        return None, {"encoding": None, "sep": None, "quotechar": None, "leitura": None, "colunas_raw": None}
+    return df, {"encoding": enc, "sep": None, "quotechar": None, "leitura": "python_fallback", "colunas_raw": int(df.shape[1])}
+
+
+def _process_csv(source: CsvSource, periodo: Periodo) -> Tuple[Optional[pd.DataFrame], dict]:
+    """Lê e normaliza um CSV trimestral. Retorna (df_normalizado ou None, linha de auditoria).
+
+    Função de módulo (e não closure) para poder rodar em um ProcessPoolExecutor.
+    """
+
+    df_raw, info = _read_quarterly_csv(source)
+    dialect = {
+        "encoding": info["encoding"],
+        "separador": info["sep"],
+        "aspas": info["quotechar"],
+        "leitura": info["leitura"],
+    }
+    if df_raw is None:
+        print(f"Falha ao ler CSV (encoding/separador): {source}")
+        return None, {
+            "arquivo": str(source),
+            "ano": periodo.ano,
+            "trimestre": periodo.trimestre,
+            "status": "read_error",
+            **dialect,
+            "linhas_raw": None,
+            "colunas_raw": None,
+            "linhas_normalizadas": None,
+            "det_reg_ans_col": None,
+            "det_cd_conta_contabil_col": None,
+            "det_descricao_conta_col": None,
+            "det_vl_saldo_inicial_col": None,
+            "det_vl_saldo_final_col": None,
+        }
+
+    detected = _detect_columns_for_audit(df_raw)
+    df_norm = _normalize_demonstracoes_schema(df_raw, periodo)
+    if df_norm is None:
+        # Provavelmente não é o CSV de demonstrativos (pode ser dicionário, etc.)
+        return None, {
+            "arquivo": str(source),
+            "ano": periodo.ano,
+            "trimestre": periodo.trimestre,
+            "status": "skipped_not_matching_schema",
+            **dialect,
+            "linhas_raw": int(df_raw.shape[0]),
+            "colunas_raw": info["colunas_raw"],
+            "linhas_normalizadas": None,
+            **detected,
+        }
+
+    print(f"OK: {source.name} -> {df_norm.shape}")
+    return df_norm, {
+        "arquivo": str(source),
+        "ano": periodo.ano,
+        "trimestre": periodo.trimestre,
+        "status": "ok",
+        **dialect,
+        "linhas_raw": int(df_raw.shape[0]),
+        "colunas_raw": info["colunas_raw"],
+        "linhas_normalizadas": int(df_norm.shape[0]),
+        **detected,
+    }
+
+
+def _csv_sources(location: Path) -> list[CsvSource]:
+    """CSVs de uma pasta extraída ou, no modo streaming, os membros .csv de um ZIP."""
+
+    if location.is_file() and zipfile.is_zipfile(location):
+        with zipfile.ZipFile(location, "r") as zf:
+            members = sorted(
+                info.filename for info in zf.infolist()
+                if not info.is_dir() and info.filename.lower().endswith(".csv")
+            )
+        return [CsvSource(location, member) for member in members]
+
+    return [CsvSource(csv_path) for csv_path in sorted(location.glob("**/*.csv"))]
+
+
+def _default_workers() -> int:
+    try:
+        return max(1, int(os.getenv("ANS_CONSOLIDATE_WORKERS", "1")))
+    except ValueError:
+        return 1
+
+
+def consolidate_demonstracoes(
+    extracted: list[Tuple[Path, Periodo]],
+    workers: Optional[int] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Percorre arquivos extraídos (ou ZIPs, no modo streaming) e gera um DataFrame
+    consolidado + relatório de validação.
+
+    Com `workers` > 1 (ou ANS_CONSOLIDATE_WORKERS), os CSVs são lidos em paralelo em
+    processos separados. Os resultados são juntados na mesma ordem da execução
+    serial, então o consolidado e a validação são idênticos.
+    """
+
+    workers = workers or _default_workers()
+
+    tasks: list[Tuple[CsvSource, Periodo]] = []
+    for location, periodo in extracted:
+        sources = _csv_sources(location)
+        if not sources:
+            print(f"Nenhum CSV encontrado em {location}")
+            continue
+        tasks.extend((source, periodo) for source in sources)
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            # map preserva a ordem de submissão -> merge determinístico
+            results = list(pool.map(_process_csv, *zip(*tasks)))
+    else:
+        results = [_process_csv(source, periodo) for source, periodo in tasks]
+
+    dfs: list[pd.DataFrame] = [df for df, _ in results if df is not None]
+    audit_rows: list[dict] = [row for _, row in results]
 
     if not dfs:
-        empty_out = pd.DataFrame(columns=[
-            "ano",
-            "trimestre",
-            "reg_ans",
-            "cd_conta_contabil",
-            "descricao_conta",
-            "vl_saldo_inicial",
-            "vl_saldo_final",
-        ])
+        empty_out = pd.DataFrame(columns=NORMALIZED_COLUMNS)
         return empty_out, pd.DataFrame(audit_rows)
 
     out = pd.concat(dfs, ignore_index=True)
@@ -262,10 +493,233 @@ def consolidate_demonstracoes(extracted: list[Tuple[Path, Periodo]]) -> Tuple[pd
     return out, pd.DataFrame(audit_rows)
 
 
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _load_manifest() -> dict:
+    if MANIFEST_PATH.exists():
+        try:
+            return json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+        except ValueError:
+            print(f"Manifesto ilegível, reprocessando tudo: {MANIFEST_PATH}")
+    return {"zips": {}, "trimestres": {}}
+
+
+def _save_manifest(manifest: dict) -> None:
+    MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = MANIFEST_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    tmp.replace(MANIFEST_PATH)
+
+
+def _period_key(periodo: Periodo) -> str:
+    return f"{periodo.ano}_{periodo.trimestre}T"
+
+
+def _quarter_paths(key: str) -> Tuple[Path, Path]:
+    return QUARTERS_DIR / f"{key}.csv.gz", QUARTERS_DIR / f"{key}.validacao.csv"
+
+
+def _read_quarter(key: str) -> pd.DataFrame:
+    data_path, _ = _quarter_paths(key)
+    return pd.read_csv(data_path, dtype=str, encoding="utf-8")
+
+
+def _rewrite_consolidated_csv(keys: list[str]) -> None:
+    """Reescreve o CSV consolidado trimestre a trimestre, sem carregar todo o histórico."""
+    tmp = OUT_CSV.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8-sig", newline="") as f:
+        f.write(",".join(NORMALIZED_COLUMNS) + "\n")
+        for key in keys:
+            _read_quarter(key).to_csv(f, index=False, header=False)
+    tmp.replace(OUT_CSV)
+
+
+def consolidate_incremental(stream: Optional[bool] = None, workers: Optional[int] = None) -> dict:
+    """Consolida apenas os trimestres cujos ZIPs são novos, mudaram ou sumiram.
+
+    O manifesto guarda sha256/tamanho/mtime de cada ZIP. Se tamanho e mtime não mudaram,
+    o hash nem é recalculado. Cada trimestre tem sua saída normalizada (e sua auditoria)
+    em QUARTERS_DIR. As saídas consolidadas são atualizadas a partir delas, com o estado
+    de cada formato (trimestres e assinaturas) registrado no manifesto: o CSV recebe
+    append quando o estado registrado continua válido e só há trimestres novos (senão é
+    regerado), e o Parquet regrava só as partições desatualizadas.
+    """
+
+    if stream is None:
+        stream = stream_zips_enabled()
+
+    manifest = _load_manifest()
+    old_zips: dict = manifest.get("zips", {})
+    quarters: dict = manifest.get("trimestres", {})
+
+    current = list_zips()
+    new_zips: dict = {}
+    by_period: Dict[str, list[Tuple[Path, Periodo]]] = {}
+    dirty: set[str] = set()
+
+    for z, periodo in current:
+        rel = z.relative_to(ZIPS_ROOT).as_posix()
+        key = _period_key(periodo)
+        by_period.setdefault(key, []).append((z, periodo))
+
+        st = z.stat()
+        entry = old_zips.get(rel)
+        if entry and entry["tamanho"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            sha = entry["sha256"]
+        else:
+            sha = _sha256(z)
+            if not entry or entry["sha256"] != sha:
+                print(f"ZIP novo ou alterado: {rel}")
+                dirty.add(key)
+
+        new_zips[rel] = {
+            "sha256": sha,
+            "tamanho": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "ano": periodo.ano,
+            "trimestre": periodo.trimestre,
+        }
+
+    for rel, entry in old_zips.items():
+        if rel not in new_zips:
+            print(f"ZIP removido: {rel}")
+            dirty.add(_period_key(Periodo(entry["ano"], entry["trimestre"])))
+
+    # Trimestres sem saída armazenada (primeira execução ou arquivo apagado)
+    for key in by_period:
+        if key not in quarters or not _quarter_paths(key)[0].exists():
+            dirty.add(key)
+
+    QUARTERS_DIR.mkdir(parents=True, exist_ok=True)
+
+    reprocess = [item for key in sorted(dirty) for item in by_period.get(key, [])]
+    sources = [(z if stream else _extract_zip(z, p), p) for z, p in reprocess]
+    df, audit_df = consolidate_demonstracoes(sources, workers=workers) if sources else (
+        pd.DataFrame(columns=NORMALIZED_COLUMNS), pd.DataFrame()
+    )
+
+    changed_frames: list[pd.DataFrame] = []
+    removed_keys: list[str] = []
+
+    for key in sorted(dirty):
+        data_path, audit_path = _quarter_paths(key)
+        if key not in by_period:
+            data_path.unlink(missing_ok=True)
+            audit_path.unlink(missing_ok=True)
+            quarters.pop(key, None)
+            removed_keys.append(key)
+            continue
+
+        ano, tri = key.rstrip("T").split("_")
+        part = df[(df["ano"] == ano) & (df["trimestre"] == tri)]
+        part.to_csv(data_path, index=False, encoding="utf-8")
+        if not audit_df.empty:
+            audit_df[(audit_df["ano"] == int(ano)) & (audit_df["trimestre"] == int(tri))].to_csv(
+                audit_path, index=False, encoding="utf-8"
+            )
+        quarters[key] = {"linhas": int(part.shape[0]), "ano": int(ano), "trimestre": int(tri)}
+        changed_frames.append(part)
+
+    # Assinatura de cada trimestre: os sha256 dos seus ZIPs. Uma saída consolidada está
+    # atualizada para o trimestre quando registrou a mesma assinatura.
+    for key in quarters:
+        shas = sorted(new_zips[z.relative_to(ZIPS_ROOT).as_posix()]["sha256"] for z, _ in by_period[key])
+        quarters[key]["assinatura"] = hashlib.sha256("|".join(shas).encode()).hexdigest()
+    current_state = {key: q["assinatura"] for key, q in quarters.items()}
+
+    keys = sorted(quarters, key=lambda k: (quarters[k]["ano"], quarters[k]["trimestre"]))
+
+    # Estado de cada formato na última vez em que foi gerado; formatos que não são
+    # gerados nesta execução mantêm o estado anterior (e ficam pendentes)
+    outputs: dict = dict(manifest.get("saidas", {}))
+
+    _ensure_dirs()
+    formats = output_formats()
+    if "csv" in formats:
+        recorded = outputs.get("csv")
+        if recorded == current_state and OUT_CSV.exists():
+            print("CSV consolidado já está atualizado.")
+        elif (
+            recorded is not None
+            and OUT_CSV.exists()
+            and all(current_state.get(key) == sig for key, sig in recorded.items())
+        ):
+            # O CSV registrado continua válido; só faltam trimestres novos
+            new_keys = [key for key in keys if key not in recorded]
+            with open(OUT_CSV, "a", encoding="utf-8-sig", newline="") as f:
+                for key in new_keys:
+                    _read_quarter(key).to_csv(f, index=False, header=False)
+            print(f"CSV consolidado atualizado (append de {len(new_keys)} trimestre(s)): {OUT_CSV}")
+        else:
+            _rewrite_consolidated_csv(keys)
+            print(f"CSV consolidado regerado: {OUT_CSV}")
+        outputs["csv"] = current_state
+
+    if "parquet" in formats:
+        recorded = outputs.get("parquet")
+        if recorded is None or not (OUT_PARQUET / SUCCESS_MARKER).exists():
+            # Dataset inexistente ou sem estado conhecido: materializa todos os trimestres
+            stale = keys
+        else:
+            stale = [key for key in keys if recorded.get(key) != current_state[key]]
+        # Partições de trimestres que não existem mais
+        removed = [
+            part for part in OUT_PARQUET.glob("ano=*/trimestre=*")
+            if f"{part.parent.name.split('=')[1]}_{part.name.split('=')[1]}T" not in current_state
+        ]
+        if stale:
+            save_parquet_dataset(pd.concat([_read_quarter(key) for key in stale], ignore_index=True), OUT_PARQUET)
+        for part in removed:
+            shutil.rmtree(part, ignore_errors=True)
+        if removed:
+            (OUT_PARQUET / SUCCESS_MARKER).touch()
+        if stale or removed:
+            print(f"Parquet consolidado atualizado: {OUT_PARQUET}")
+        else:
+            print("Parquet consolidado já está atualizado.")
+        outputs["parquet"] = current_state
+
+    audits = [
+        pd.read_csv(_quarter_paths(key)[1], encoding="utf-8")
+        for key in keys if _quarter_paths(key)[1].exists()
+    ]
+    if audits:
+        pd.concat(audits, ignore_index=True).to_csv(OUT_VALIDATION_CSV, index=False, encoding="utf-8-sig")
+
+    manifest = {"zips": new_zips, "trimestres": quarters, "saidas": outputs}
+    _save_manifest(manifest)
+
+    return {
+        "reprocessados": sorted(k for k in dirty if k in by_period),
+        "removidos": removed_keys,
+        "total_trimestres": len(keys),
+        "linhas_novas": int(sum(p.shape[0] for p in changed_frames)),
+    }
+
+
+def incremental_enabled() -> bool:
+    return os.getenv("ANS_INCREMENTAL", "1").strip().lower() not in ("0", "false", "no")
+
+
 def main():
     print("=== Preparação Demonstrações Contábeis (descompactar + consolidar) ===\n")
 
-    extracted = extract_all_zips()
+    if incremental_enabled():
+        summary = consolidate_incremental()
+        if not summary["total_trimestres"]:
+            print("Nada para processar. Baixe os ZIPs antes.")
+            return
+        print(f"\nTrimestres reprocessados: {summary['reprocessados'] or 'nenhum'}")
+        print(f"Linhas novas: {summary['linhas_novas']} | Trimestres no consolidado: {summary['total_trimestres']}")
+        return
+
+    extracted = collect_sources()
     if not extracted:
         print("Nada para processar. Baixe os ZIPs antes.")
         return
@@ -274,8 +728,13 @@ def main():
     print(f"\nConsolidado: {df.shape}")
 
     _ensure_dirs()
-    df.to_csv(OUT_CSV, index=False, encoding="utf-8-sig")
-    print(f"CSV consolidado gerado em: {OUT_CSV}")
+    formats = output_formats()
+    if "csv" in formats:
+        df.to_csv(OUT_CSV, index=False, encoding="utf-8-sig")
+        print(f"CSV consolidado gerado em: {OUT_CSV}")
+    if "parquet" in formats:
+        save_parquet_dataset(df, OUT_PARQUET)
+        print(f"Parquet consolidado gerado em: {OUT_PARQUET}")
 
     audit_df.to_csv(OUT_VALIDATION_CSV, index=False, encoding="utf-8-sig")
     print(f"Validação gerada em: {OUT_VALIDATION_CSV}")
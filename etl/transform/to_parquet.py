@@ -0,0 +1,87 @@
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from etl.transform.br_decimal import parse_br_decimal
+
+# Dataset particionado em diretórios ano=AAAA/trimestre=T (estilo Hive)
+PARTITION_COLS = ["ano", "trimestre"]
+CATEGORICAL_COLS = ["reg_ans", "cd_conta_contabil", "descricao_conta", "descricao_norm"]
+FLOAT_COLS = ["vl_saldo_inicial", "vl_saldo_final", "vl_saldo_final_num"]
+
+# Arquivo gravado ao final de cada escrita; serve de assinatura barata do dataset
+SUCCESS_MARKER = "_SUCCESS"
+
+
+def _require_pyarrow() -> None:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError("A saída Parquet requer o pacote opcional 'pyarrow' (pip install pyarrow).") from e
+
+
+def type_demonstracoes(df: pd.DataFrame) -> pd.DataFrame:
+    """Aplica os tipos do dataset colunar: int ano/trimestre, float saldos, categorias de texto."""
+    out = df.copy()
+
+    # Colunas de partição não podem ser nulas (ano/trimestre vêm sempre do nome do ZIP)
+    for c in PARTITION_COLS:
+        if c in out.columns:
+            out[c] = pd.to_numeric(out[c], errors="raise").astype("int16")
+
+    for c in FLOAT_COLS:
+        if c in out.columns and not pd.api.types.is_float_dtype(out[c]):
+            # Saldos ausentes/inválidos ficam nulos (NaN) no dataset tipado
+            out[c], _ = parse_br_decimal(out[c], fill_value=np.nan)
+
+    for c in CATEGORICAL_COLS:
+        if c in out.columns:
+            out[c] = out[c].astype("category")
+
+    return out
+
+
+def save_parquet_dataset(df: pd.DataFrame, out_dir: Path, partition_cols: Sequence[str] = PARTITION_COLS) -> Path:
+    """Grava `df` tipado e particionado por ano/trimestre.
+
+    Só as partições presentes em `df` são substituídas; as demais são preservadas.
+    """
+    _require_pyarrow()
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    typed = type_demonstracoes(df)
+    typed.to_parquet(
+        out_dir,
+        engine="pyarrow",
+        index=False,
+        partition_cols=list(partition_cols),
+        existing_data_behavior="delete_matching",
+    )
+    (out_dir / SUCCESS_MARKER).touch()
+    return out_dir
+
+
+def read_parquet_dataset(
+    path: Path,
+    columns: Optional[List[str]] = None,
+    periods: Optional[Iterable[Tuple[int, int]]] = None,
+) -> pd.DataFrame:
+    """Lê apenas as colunas e partições (ano, trimestre) pedidas."""
+    _require_pyarrow()
+
+    filters = None
+    if periods is not None:
+        filters = [[("ano", "=", int(a)), ("trimestre", "=", int(t))] for a, t in periods]
+        if not filters:
+            return pd.DataFrame(columns=columns or [])
+
+    df = pd.read_parquet(path, engine="pyarrow", columns=columns, filters=filters)
+
+    # Colunas de partição voltam como categoria; restaura o tipo inteiro
+    for c in PARTITION_COLS:
+        if c in df.columns:
+            df[c] = df[c].astype(str).astype("int16")
+
+    return df
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Benchmark da busca aproximada (fuzzy) conforme o catálogo cresce.
+
+Uso: python scripts/bench_fuzzy.py [--scales 1,4,16,64] [--repeat 20] [--budget-ms 25]
+
+Cada escala replica o catálogo com nomes levemente alterados (sufixo por cópia), de
+modo que as listas de n-gramas crescem junto. A geração de candidatos e a verificação
+por distância de edição têm orçamento fixo (FUZZY_MAX_POSTINGS / FUZZY_MAX_VERIFY),
+então a latência deve ficar estável. Sai com código 1 se o p95 passar de --budget-ms.
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from api.search_service import OperadorasSearchService, SearchIndex
+
+QUERIES = ["unimde", "bradsco saude", "odontoprve", "hapvdia", "sao paulo", "amil", "saude", "cooperativa medica"]
+
+
+def _scaled(base: SearchIndex, scale: int) -> SearchIndex:
+    records = {f: list(col) for f, col in base._records.items()}
+    for copy in range(1, scale):
+        for field, col in base._records.items():
+            suffix = f" FILIAL {copy}" if field in ("razao_social", "nome_fantasia") else ""
+            records[field].extend(v + suffix for v in col)
+    return SearchIndex(records)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", default="1,4,16,64")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=25.0)
+    parser.add_argument("--csv", default=None)
+    args = parser.parse_args()
+
+    base = OperadorasSearchService(csv_path=args.csv)
+    base.load()
+
+    print(f"{'registros':>10}{'p50 (ms)':>12}{'p95 (ms)':>12}{'máx (ms)':>12}")
+    worst = 0.0
+    for scale in (int(s) for s in args.scales.split(",")):
+        service = _scaled(base.index, scale)
+        samples = []
+        for query in QUERIES:
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                service.search_fuzzy(query, limit=50)
+                samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        p95 = samples[int(len(samples) * 0.95) - 1]
+        worst = max(worst, p95)
+        print(f"{len(service):>10}{statistics.median(samples):>12.2f}{p95:>12.2f}{samples[-1]:>12.2f}")
+
+    if worst > args.budget_ms:
+        print(f"\np95 acima do orçamento de {args.budget_ms} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
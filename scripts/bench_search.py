@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Micro-benchmark da busca de operadoras: índice de n-gramas vs varredura linear.
+
+Uso: python scripts/bench_search.py [--repeat 200] [--scale 1]
+
+--scale replica o catálogo N vezes para simular um CADOP maior.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from api.search_service import SEARCH_FIELDS, OperadorasSearchService, SearchIndex, _normalize_text
+
+QUERIES = ["sa", "amil", "unimed", "bradesco saude", "418374", "11828089", "sao paulo", "saude", "odonto", "zzzz"]
+
+
+def _linear_scan(index: SearchIndex, q: str, limit: int = 50) -> list:
+    """Varredura linear de referência: testa a consulta em todos os registros."""
+    hits = []
+    for i in range(len(index)):
+        score = sum(weight for field, weight in SEARCH_FIELDS if q in index._normalized[field][i])
+        if score > 0:
+            hits.append((score, index._item(i)))
+    hits.sort(key=lambda h: h[0], reverse=True)
+    return hits[:limit]
+
+
+def _timeit(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--csv", default=None)
+    args = parser.parse_args()
+
+    service = OperadorasSearchService(csv_path=args.csv)
+    service.load()
+    index = service.index
+    if args.scale > 1:
+        index = SearchIndex({f: col * args.scale for f, col in index._records.items()})
+
+    n = len(index)
+    print(f"Catálogo: {n} registros, {len(index._postings)} n-gramas\n")
+    print(f"{'consulta':<18}{'linear (ms)':>14}{'índice (ms)':>14}{'speedup':>10}")
+
+    for query in QUERIES:
+        q = _normalize_text(query)
+        linear = _timeit(
+            lambda: _linear_scan(index, q),
+            args.repeat,
+        )
+        indexed = _timeit(lambda: index.search(query, limit=50), args.repeat)
+        print(f"{query:<18}{linear:>14.3f}{indexed:>14.3f}{linear / indexed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
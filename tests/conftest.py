@@ -0,0 +1,25 @@
+import pytest
+
+CADOP_HEADER = (
+    "Registro ANS;CNPJ;Razão Social;Nome Fantasia;Modalidade;Logradouro;Número;Complemento;"
+    "Bairro;Cidade;UF;CEP;DDD;Telefone;Fax;Endereço eletrônico;Representante;Cargo Representante;"
+    "Data Registro ANS"
+)
+
+CADOP_ROWS = [
+    ("326305", "29309127000179", "AMIL ASSISTÊNCIA MÉDICA INTERNACIONAL S.A.", "AMIL", "Medicina de Grupo"),
+    ("005711", "92693118000160", "BRADESCO SAÚDE S.A.", "BRADESCO SAÚDE", "Seguradora Especializada em Saúde"),
+    ("343889", "17505793000101", "UNIMED BELO HORIZONTE COOPERATIVA DE TRABALHO MÉDICO", "UNIMED-BH", "Cooperativa Médica"),
+    ("368253", "11828089000103", "SÃO FRANCISCO SAÚDE", "", "Medicina de Grupo"),
+    ("412562", "00000000000191", "ODONTOPREV S.A.", "ODONTOPREV", "Odontologia de Grupo"),
+]
+
+
+@pytest.fixture
+def cadop_csv(tmp_path):
+    path = tmp_path / "relatorio_cadop.csv"
+    lines = ["Relação de Operadoras Ativas ANS" + ";" * 18, CADOP_HEADER]
+    for row in CADOP_ROWS:
+        lines.append(";".join(row) + ";" * 14)
+    path.write_bytes(("\n".join(lines) + "\n").encode("latin1"))
+    return path
@@ -0,0 +1,157 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import main
+from api.response_cache import ResponseCache, dumps
+from etl.transform.cubo import build_cubo, save_cubo
+from test_cubo import DEMO_ROWS, SINISTROS, _demo
+
+
+@pytest.fixture
+def client(cadop_csv, tmp_path, monkeypatch):
+    demo = tmp_path / "demo.csv"
+    demo.write_text("reg_ans,descricao_norm,vl_saldo_final_num\n000001,A,10\n000002,B,30\n", encoding="utf-8-sig")
+    monkeypatch.setenv("CADOP_CSV_PATH", str(cadop_csv))
+    monkeypatch.setenv("DEMO_CONSOLIDADO_CSV_PATH", str(demo))
+    monkeypatch.setenv("ANS_CUBO_PATH", str(save_cubo(build_cubo(_demo(DEMO_ROWS)), tmp_path / "cubo.parquet")))
+    with TestClient(main.app) as c:
+        yield c
+
+
+def test_search_response_is_cached_by_normalized_query(client):
+    first = client.get("/search", params={"query": "Saúde"})
+    assert first.headers["content-type"] == "application/json"
+    data = first.json()
+    assert data["query"] == "Saúde" and data["count"] == len(data["results"]) > 0
+
+    calls = []
+    index = main._service.index
+    original = index.search
+    index.search = lambda *a, **k: calls.append(a) or original(*a, **k)
+    try:
+        again = client.get("/search", params={"query": "  SAUDE "}).json()
+    finally:
+        del index.search
+
+    assert calls == []
+    assert again["query"] == "  SAUDE " and again["results"] == data["results"]
+
+    # Nova versão dos dados: a chave muda e a consulta é refeita
+    main._service.load()
+    assert client.get("/search", params={"query": "saude"}).json()["results"] == data["results"]
+    assert main._cache.misses == 2
+
+
+def test_top_10_body_matches_default_json_encoding(client):
+    r = client.get("/analytics/top-10")
+    assert r.json() == [
+        {"reg_ans": "000002", "Razao Social": "B", "valor_real": 30},
+        {"reg_ans": "000001", "Razao Social": "A", "valor_real": 10},
+    ]
+    assert r.content == json.dumps(r.json(), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = ResponseCache(max_entries=2, max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"5678")
+    assert cache.get("a") == b"1234"  # "a" passa a ser o mais recente
+    cache.put("c", b"9")
+    assert cache.get("b") is None and len(cache) == 2
+
+    cache.put("d", b"123456789")  # excede o limite de bytes: expulsa o mais antigo
+    assert cache.get("a") is None and cache.get("c") == b"9"
+    assert cache.size_bytes == 10
+
+    cache.put("grande", b"x" * 11)
+    assert cache.get("grande") is None
+    assert cache.get_or_build("e", lambda: {"ok": "ç"}) == dumps({"ok": "ç"})
+
+
+def test_suggest_endpoint(client):
+    r = client.get("/search/suggest", params={"query": "odonto", "limit": 5})
+    assert r.status_code == 200
+    data = r.json()
+    assert data["count"] == 1 and data["results"][0]["registro_ans"] == "412562"
+    assert client.get("/search/suggest", params={"query": "x", "limit": 51}).status_code == 422
+
+
+def test_fuzzy_search_endpoint(client):
+    assert client.get("/search", params={"query": "odontoprve"}).json()["count"] == 0
+    data = client.get("/search", params={"query": "odontoprve", "fuzzy": 1}).json()
+    assert data["results"][0]["registro_ans"] == "412562"
+
+
+def test_admin_reload_swaps_index_and_reports_version(client, cadop_csv, monkeypatch):
+    info = client.get("/search/index").json()
+    assert info["versao"] == 1 and info["registros"] == 5
+    # O caminho do CSV no servidor não é exposto
+    assert "arquivo" not in info
+
+    # Sem ADMIN_TOKEN a recarga fica desativada, com ou sem cabeçalho
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert client.post("/admin/reload-index").status_code == 403
+    assert client.post("/admin/reload-index", headers={"X-Admin-Token": ""}).status_code == 403
+
+    monkeypatch.setenv("ADMIN_TOKEN", "segredo")
+    assert client.post("/admin/reload-index").status_code == 403
+    assert client.post("/admin/reload-index", headers={"X-Admin-Token": "errado"}).status_code == 403
+
+    with open(cadop_csv, "ab") as f:
+        f.write(("421545;11111111000111;HAPVIDA ASSISTÊNCIA MÉDICA;HAPVIDA;Medicina de Grupo" + ";" * 14 + "\n").encode("latin1"))
+    r = client.post("/admin/reload-index", headers={"X-Admin-Token": "segredo"})
+    assert r.status_code == 200 and r.json()["versao"] == 2 and r.json()["registros"] == 6
+    assert client.get("/search", params={"query": "hapvida"}).json()["count"] == 1
+
+
+def test_accounts_endpoint_defaults_to_latest_period(client):
+    assert client.get("/analytics/periodos").json() == [{"ano": 2024, "trimestre": 2}, {"ano": 2024, "trimestre": 1}]
+
+    data = client.get("/analytics/contas").json()
+    assert (data["ano"], data["trimestre"]) == (2024, 2)
+    assert {c["cd_conta_contabil"]: c["valor_real"] for c in data["contas"]} == {"31": 150.0, "411": 20.0}
+
+    data = client.get("/analytics/contas", params={"ano": 2024, "trimestre": 1}).json()
+    assert {c["cd_conta_contabil"]: c["vl_acumulado"] for c in data["contas"]} == {"31": 100.0, "411": 50.0}
+
+
+def test_top_n_endpoint_is_parameterized_and_cached(client):
+    # Padrão: janela móvel de 4 trimestres até o período mais recente
+    data = client.get("/analytics/top-n").json()
+    assert (data["ano"], data["trimestre"], data["contas"], data["window"]) == (2024, 2, ["411"], 4)
+    assert len(data["periodos"]) == 4
+    assert [(r["reg_ans"], r["valor_real"]) for r in data["results"]] == [("000002", 45.0), ("000001", 25.0)]
+    assert data["results"][0]["razao_social"] is None  # registro fora do CADOP de teste
+
+    data = client.get("/analytics/top-n", params={"window": 1}).json()
+    assert [(r["reg_ans"], r["valor_real"]) for r in data["results"]] == [("000001", 15.0), ("000002", 5.0)]
+
+    data = client.get("/analytics/top-n", params={"n": 1, "ano": 2024, "trimestre": 2, "window": 2}).json()
+    assert data["periodos"] == [{"ano": 2024, "trimestre": 2}, {"ano": 2024, "trimestre": 1}]
+    assert [(r["reg_ans"], r["valor_real"]) for r in data["results"]] == [("000002", 45.0)]
+
+    data = client.get("/analytics/top-n", params={"conta": "31", "ano": 2024, "trimestre": 1}).json()
+    assert [r["reg_ans"] for r in data["results"]] == ["000001"]
+
+    misses = main._cache.misses
+    client.get("/analytics/top-n", params={"conta": "31", "ano": 2024, "trimestre": 1})
+    assert main._cache.misses == misses
+    assert client.get("/analytics/top-n", params={"window": 0}).status_code == 422
+
+
+def test_operator_series_joins_cadop_metadata(client, tmp_path):
+    data = client.get("/operadoras/1/series").json()
+    assert data["registro_ans"] == "000001" and data["operadora"] is None
+    assert [(r["ano"], r["trimestre"], r["valor_real"]) for r in data["series"]] == [(2024, 1, 10.0), (2024, 2, 15.0)]
+    assert client.get("/operadoras/000001/series", params={"conta": "31"}).json()["count"] == 2
+
+    # Cubo regravado com uma operadora do CADOP: recarregado na próxima consulta
+    rows = DEMO_ROWS + [("2024", "1", "326305", "411", SINISTROS, 7.0)]
+    save_cubo(build_cubo(_demo(rows)), tmp_path / "cubo.parquet")
+    data = client.get("/operadoras/326305/series").json()
+    assert data["operadora"]["razao_social"] == "AMIL ASSISTÊNCIA MÉDICA INTERNACIONAL S.A."
+    assert data["series"][0]["valor_real"] == 7.0
+
+    assert client.get("/operadoras/999999/series").status_code == 404
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from etl.scripts.run_import_and_analytics import clean_numeric
+from etl.transform.br_decimal import parse_br_decimal
+
+SAMPLES = [
+    "1.234,56", "-1.234.567,89", "1234,5", "0,00", "-0", "12", "5.", ".5", "-,5", "1234.5",
+    "123456789012345", "1234567890123456,78", "R$ 1.234,56", " 42 ", "1.2.3", "1,2,3", "--1",
+    "1-1", "-", ".", "abc", "", " ", "nan", "NaN", "None", None, np.nan, 7, 1234.5,
+]
+
+
+def test_matches_clean_numeric_bit_for_bit():
+    values = pd.Series(SAMPLES, dtype=object)
+    parsed, _ = parse_br_decimal(values)
+    expected = values.map(clean_numeric)
+
+    assert parsed.dtype == "float64"
+    np.testing.assert_array_equal(parsed.to_numpy(), expected.to_numpy())
+    np.testing.assert_array_equal(np.signbit(parsed.to_numpy()), np.signbit(expected.to_numpy()))
+
+
+def test_counts_failures_but_not_blanks():
+    values = pd.Series(["1,5", "abc", "1.2.3", "", "nan", None], dtype=object)
+    parsed, failed = parse_br_decimal(values)
+
+    assert failed == 2
+    assert parsed.tolist() == [1.5, 0.0, 0.0, 0.0, 0.0, 0.0]
+
+
+def test_fill_value_and_index_are_preserved():
+    values = pd.Series(["2,5", "", "x"], index=[10, 20, 30], name="vl_saldo_final")
+    parsed, failed = parse_br_decimal(values, fill_value=np.nan)
+
+    assert parsed.index.tolist() == [10, 20, 30]
+    assert parsed.name == "vl_saldo_final"
+    assert parsed.iloc[0] == 2.5 and np.isnan(parsed.iloc[1]) and np.isnan(parsed.iloc[2])
+    assert failed == 1
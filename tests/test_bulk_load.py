@@ -0,0 +1,69 @@
+import csv
+import math
+
+import pandas as pd
+from sqlalchemy import create_engine, inspect, text
+
+from etl.load import bulk_load as bl
+from etl.load.bulk_load import _to_csv, bulk_load, iter_demonstracoes
+
+CONSOLIDADO = pd.DataFrame({
+    "ano": ["2024", "2024", "2024"],
+    "trimestre": ["1", "1", "2"],
+    "reg_ans": ["000001", "000002", ""],
+    "cd_conta_contabil": ["411", "411", "31"],
+    "descricao_conta": ["EVENTOS, \"HOSPITALAR\"", "EVENTOS", None],
+    "vl_saldo_inicial": ["1.234,56", "", "abc"],
+    "vl_saldo_final": ["10,5", "-2.000,00", "7"],
+})
+
+
+def test_chunks_are_typed_for_the_table(tmp_path):
+    CONSOLIDADO.to_csv(tmp_path / "consolidado.csv", index=False, encoding="utf-8-sig")
+
+    chunks = list(iter_demonstracoes(tmp_path / "consolidado.csv", tmp_path / "sem_parquet", chunk_rows=2))
+
+    assert [len(c) for c in chunks] == [2, 1]
+    df = pd.concat(chunks)
+    assert df["ano"].dtype == "int64" and df["vl_saldo_final"].tolist() == [10.5, -2000.0, 7.0]
+    assert df["vl_saldo_inicial"].tolist()[0] == 1234.56 and df["vl_saldo_inicial"].isna().tolist()[1:] == [True, True]
+    assert df["reg_ans"].tolist()[2] is None
+
+    # Postgres (CSV): NULL é campo vazio sem aspas
+    assert _to_csv(df.iloc[[2]], "") == "2024,2,,31,,,7.0\n"
+    # MySQL: texto sempre entre aspas (o texto "NULL" não vira NULL); NULL é "" (NULLIF no LOAD DATA)
+    assert _to_csv(df.iloc[[2]], "", csv.QUOTE_NONNUMERIC) == '2024,2,"","31","","",7.0\n'
+    literal = df.iloc[[1]].assign(descricao_conta="NULL")
+    assert _to_csv(literal, "", csv.QUOTE_NONNUMERIC) == '2024,1,"000002","411","NULL","",-2000.0\n'
+    assert '"EVENTOS, ""HOSPITALAR"""' in _to_csv(df.iloc[[0]], "")
+
+
+def test_bulk_load_replaces_rows_and_rebuilds_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ans.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE demonstracoes_contabeis (ano INTEGER NOT NULL, trimestre INTEGER NOT NULL, "
+            "reg_ans TEXT, cd_conta_contabil TEXT, descricao_conta TEXT, vl_saldo_inicial NUMERIC, vl_saldo_final NUMERIC)"
+        ))
+        conn.execute(text("CREATE INDEX idx_demonstracoes_periodo ON demonstracoes_contabeis (ano, trimestre)"))
+        conn.execute(text("INSERT INTO demonstracoes_contabeis (ano, trimestre) VALUES (1999, 1)"))
+    CONSOLIDADO.to_csv(tmp_path / "consolidado.csv", index=False)
+
+    logs = []
+    report = bulk_load(engine, iter_demonstracoes(tmp_path / "consolidado.csv", tmp_path / "x", chunk_rows=2), log=logs.append)
+
+    assert report.linhas == 3 and report.linhas_por_segundo > 0
+    assert len(logs) == 3 and "linhas/s" in logs[-1]
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT ano, reg_ans, vl_saldo_inicial, vl_saldo_final FROM demonstracoes_contabeis")).all()
+    assert [(r[0], r[1], r[3]) for r in rows] == [(2024, "000001", 10.5), (2024, "000002", -2000.0), (2024, None, 7.0)]
+    assert math.isclose(rows[0][2], 1234.56) and rows[1][2] is None
+    assert [i["name"] for i in inspect(engine).get_indexes("demonstracoes_contabeis")] == ["idx_demonstracoes_periodo"]
+
+
+def test_main_reports_missing_consolidated_input(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(bl, "OUT_CSV", tmp_path / "consolidado.csv")
+    monkeypatch.setattr(bl, "OUT_PARQUET", tmp_path / "consolidado.parquet")
+
+    bl.main(f"sqlite:///{tmp_path / 'ans.db'}")
+    assert "Consolidado não encontrado" in capsys.readouterr().out
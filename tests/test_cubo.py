@@ -0,0 +1,118 @@
+import json
+
+import pandas as pd
+import pytest
+
+from api import response_cache
+from api.cubo_service import CuboService, janela
+from etl.transform.cubo import build_cubo, load_cubo, save_cubo
+
+
+def _demo(rows):
+    return pd.DataFrame(
+        rows, columns=["ano", "trimestre", "reg_ans", "cd_conta_contabil", "descricao_conta", "vl_saldo_final_num"]
+    )
+
+
+SINISTROS = "EVENTOS/ SINISTROS CONHECIDOS OU AVISADOS DE ASSISTÊNCIA A SAÚDE MEDICO HOSPITALAR"
+
+DEMO_ROWS = [
+    ("2024", "1", "000001", "411", SINISTROS, 10.0),
+    ("2024", "2", "000001", "411", SINISTROS, 25.0),
+    ("2024", "1", "000002", "411", SINISTROS, 40.0),
+    ("2024", "2", "000002", "411", SINISTROS, 45.0),
+    ("2024", "2", "000003", "411", SINISTROS, 99.0),  # sem o 1º trimestre: lacuna
+    ("2024", "1", "000001", "31", "RECEITAS", 100.0),
+    ("2024", "2", "000001", "31", "RECEITAS", 250.0),
+    (None, "2", "000001", "31", "RECEITAS", 1.0),
+]
+
+
+@pytest.fixture
+def cubo_path(tmp_path):
+    return save_cubo(build_cubo(_demo(DEMO_ROWS)), tmp_path / "cubo.parquet")
+
+
+def test_cube_is_keyed_by_period_account_and_operator(cubo_path):
+    cubo = load_cubo(cubo_path.with_suffix(".parquet"))
+
+    assert cubo[["ano", "trimestre", "cd_conta_contabil", "reg_ans"]].astype(str).values.tolist() == [
+        ["2024", "1", "31", "000001"], ["2024", "1", "411", "000001"], ["2024", "1", "411", "000002"],
+        ["2024", "2", "31", "000001"], ["2024", "2", "411", "000001"], ["2024", "2", "411", "000002"],
+        ["2024", "2", "411", "000003"],
+    ]
+    assert cubo["vl_acumulado"].tolist() == [100.0, 10.0, 40.0, 250.0, 25.0, 45.0, 99.0]
+    assert cubo["valor_real"].fillna(-1).tolist() == [100.0, 10.0, 40.0, 150.0, 15.0, 5.0, -1]
+    assert cubo["lacuna"].tolist() == [False] * 6 + [True]
+    assert cubo["reg_ans"].dtype == "category" and cubo["ano"].dtype == "int16"
+
+
+def test_service_answers_top_series_and_accounts(cubo_path):
+    service = CuboService(path=str(cubo_path.with_suffix(".parquet")))
+    assert service.refresh() is True and service.refresh() is False
+
+    assert service.periodos() == [(2024, 2), (2024, 1)]
+    assert service.top(10, 2024, 2, "411") == [{"reg_ans": "000001", "valor": 15.0}, {"reg_ans": "000002", "valor": 5.0}]
+    assert service.top(1, 2024, 2, "411", acumulado=True) == [{"reg_ans": "000003", "valor": 99.0}]
+    assert service.top(10, 2023, 4, "411") == []
+
+    serie = service.serie("000001", "31")
+    assert [(r["ano"], r["trimestre"], r["valor_real"]) for r in serie] == [(2024, 1, 100.0), (2024, 2, 150.0)]
+    assert len(service.serie("000001")) == 4 and service.serie("999999") == []
+
+    contas = {c["cd_conta_contabil"]: c for c in service.contas(2024, 2)}
+    assert contas["411"]["operadoras"] == 3 and contas["411"]["lacunas"] == 1
+    assert contas["411"]["valor_real"] == 20.0 and contas["31"]["descricao_conta"] == "RECEITAS"
+
+
+def test_top_sums_a_window_of_calendar_quarters(tmp_path):
+    rows = [
+        ("2023", "3", "000001", "411", SINISTROS, 50.0),  # lacuna: sem 2023T2
+        ("2023", "3", "000002", "411", SINISTROS, 4.0),
+        ("2023", "4", "000001", "411", SINISTROS, 80.0),
+        ("2023", "4", "000002", "411", SINISTROS, 10.0),
+        ("2024", "1", "000001", "411", SINISTROS, 5.0),
+        ("2024", "1", "000002", "411", SINISTROS, 30.0),
+        ("2024", "2", "000001", "411", SINISTROS, 6.0),
+        ("2024", "2", "000002", "411", SINISTROS, 70.0),
+        ("2024", "1", "000002", "4111", "SUBCONTA", 900.0),
+        ("2024", "2", "000002", "4111", "SUBCONTA", 1000.0),
+    ]
+    path = save_cubo(build_cubo(_demo(rows)), tmp_path / "cubo.parquet")
+    service = CuboService(path=str(path.with_suffix(".parquet")))
+    service.refresh()
+
+    assert janela(2024, 2, 4) == [(2024, 2), (2024, 1), (2023, 4), (2023, 3)]
+    assert service.contas_padrao() == ["411"]
+    assert service.top(10, 2024, 2, "411", window=1) == [{"reg_ans": "000002", "valor": 40.0}, {"reg_ans": "000001", "valor": 1.0}]
+    # 2024T2 (1 e 40) + 2024T1 (5 e 30) + 2023T4 (30 e 6); 2023T3 tem lacuna e fica de fora
+    assert service.top(10, 2024, 2, ["411"], window=4) == [{"reg_ans": "000002", "valor": 76.0}, {"reg_ans": "000001", "valor": 36.0}]
+    assert service.top(1, 2024, 2, ["411", "4111"], window=2) == [{"reg_ans": "000002", "valor": 1070.0}]
+    with pytest.raises(ValueError):
+        service.top(10, 2024, 2, "411", window=2, acumulado=True)
+
+
+def test_service_without_cube_is_empty(tmp_path):
+    service = CuboService(path=str(tmp_path / "ausente.parquet"))
+    service.refresh()
+    assert service.periodos() == [] and service.top(10, 2024, 1, "411") == [] and service.contas(2024, 1) == []
+
+
+def test_missing_values_are_serialized_as_null_without_orjson(tmp_path, monkeypatch):
+    rows = [
+        ("2024", "1", "000001", "411", None, 10.0),
+        ("2024", "1", "000002", "411", None, None),
+    ]
+    path = save_cubo(build_cubo(_demo(rows)), tmp_path / "cubo.parquet")
+    service = CuboService(path=str(path.with_suffix(".parquet")))
+    service.refresh()
+    monkeypatch.setattr(response_cache, "orjson", None)
+
+    contas = service.contas(2024, 1)
+    assert contas[0]["descricao_conta"] is None
+    serie = service.serie("000002")
+    assert serie[0]["vl_acumulado"] is None and serie[0]["valor_real"] is None
+    # JSON válido (sem o token NaN da stdlib)
+    for body in (response_cache.dumps(contas), response_cache.dumps(serie)):
+        assert b"NaN" not in body
+        json.loads(body, parse_constant=lambda c: pytest.fail(f"constante {c} no JSON"))
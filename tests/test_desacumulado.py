@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from etl.transform.desacumulado import desacumular
+
+
+def _linha(reg, conta, ano, tri, valor):
+    return {"reg_ans": reg, "cd_conta_contabil": conta, "ano": ano, "trimestre": tri, "vl_saldo_final_num": valor}
+
+
+def test_quarterly_deltas_per_operator_and_account():
+    df = pd.DataFrame([
+        _linha("000002", "411", 2024, 2, 30.0),
+        _linha("000001", "411", 2024, 1, 10.0),
+        _linha("000001", "411", 2024, 2, 25.0),
+        _linha("000001", "412", 2024, 2, 7.0),
+        _linha("000001", "412", 2024, 1, 4.0),
+        _linha("000001", "411", 2025, 1, 3.0),
+        _linha("000002", "411", 2024, 1, 12.0),
+    ])
+
+    out = desacumular(df)
+
+    assert out[["reg_ans", "cd_conta_contabil", "ano", "trimestre"]].values.tolist() == [
+        ["000001", "411", 2024, 1], ["000001", "411", 2024, 2], ["000001", "411", 2025, 1],
+        ["000001", "412", 2024, 1], ["000001", "412", 2024, 2],
+        ["000002", "411", 2024, 1], ["000002", "411", 2024, 2],
+    ]
+    # O 1º trimestre de cada ano recomeça o acumulado
+    assert out["valor_real"].tolist() == [10.0, 15.0, 3.0, 4.0, 3.0, 12.0, 18.0]
+    assert not out["lacuna"].any()
+
+
+def test_missing_previous_quarter_is_flagged_not_subtracted():
+    df = pd.DataFrame([
+        _linha("000001", "411", 2024, 1, 10.0),
+        _linha("000001", "411", 2024, 3, 40.0),  # falta o 2º trimestre
+        _linha("000001", "411", 2024, 4, 55.0),
+        _linha("000001", "411", 2025, 2, 8.0),   # falta o 1º trimestre do ano
+    ])
+
+    out = desacumular(df)
+
+    assert out["lacuna"].tolist() == [False, True, False, True]
+    np.testing.assert_array_equal(out["valor_real"], [10.0, np.nan, 15.0, np.nan])
+
+
+def test_duplicate_rows_are_summed_in_the_cell():
+    df = pd.DataFrame([
+        _linha("000001", "411", 2024, 1, 10.0),
+        _linha("000001", "411", 2024, 1, 5.0),
+        _linha("000001", "411", 2024, 2, 20.0),
+    ])
+
+    out = desacumular(df, chaves=["reg_ans"])
+
+    assert out["vl_saldo_final_num"].tolist() == [15.0, 20.0]
+    assert out["valor_real"].tolist() == [15.0, 5.0]
+
+
+def test_matches_reference_loop_on_random_data():
+    rng = np.random.default_rng(0)
+    n = 2000
+    df = pd.DataFrame({
+        "reg_ans": rng.choice([f"{i:06d}" for i in range(30)], n),
+        "cd_conta_contabil": rng.choice(["41", "411", "4111"], n),
+        "ano": rng.choice([2023, 2024], n),
+        "trimestre": rng.integers(1, 5, n),
+        "vl_saldo_final_num": rng.integers(0, 1000, n).astype(float),
+    })
+
+    out = desacumular(df).set_index(["reg_ans", "cd_conta_contabil", "ano", "trimestre"])
+
+    acumulado = df.groupby(["reg_ans", "cd_conta_contabil", "ano", "trimestre"])["vl_saldo_final_num"].sum()
+    for (reg, conta, ano, tri), valor in acumulado.items():
+        if tri == 1:
+            esperado = valor
+        else:
+            anterior = acumulado.get((reg, conta, ano, tri - 1))
+            esperado = np.nan if anterior is None else valor - anterior
+        np.testing.assert_equal(out.loc[(reg, conta, ano, tri), "valor_real"], esperado)
+    assert len(out) == len(acumulado)
+
+
+def test_invalid_quarter_raises():
+    with pytest.raises(ValueError):
+        desacumular(pd.DataFrame([_linha("000001", "411", 2024, 5, 1.0)]))
+    assert desacumular(pd.DataFrame(columns=["reg_ans", "cd_conta_contabil", "ano", "trimestre", "vl_saldo_final_num"])).empty
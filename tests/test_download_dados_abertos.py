@@ -0,0 +1,19 @@
+import requests
+
+from etl.scraping import download_dados_abertos_ans as dl
+
+
+def _offline(*args, **kwargs):
+    raise requests.ConnectionError("sem rede")
+
+
+def test_cadop_download_failure_keeps_local_copy(tmp_path, monkeypatch):
+    monkeypatch.setattr(dl, "RAW_DIR", tmp_path)
+    monkeypatch.setattr(dl, "download_if_modified", _offline)
+
+    assert dl.download_operadoras_ativas_cadop() is None
+
+    local = tmp_path / "operadoras_ativas" / "relatorio_cadop.csv"
+    local.parent.mkdir(parents=True)
+    local.write_text("Registro ANS;CNPJ\n", encoding="utf-8")
+    assert dl.download_operadoras_ativas_cadop() == local
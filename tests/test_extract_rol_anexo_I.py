@@ -0,0 +1,162 @@
+import importlib
+import sys
+import types
+
+import pandas as pd
+import pytest
+from pypdf import PdfWriter
+from pypdf.generic import NameObject, StreamObject
+
+from etl.transform.map_abbreviations import replace_od_amb_values
+from etl.transform.pdf_document import PdfDocument
+
+N_PAGES = 7
+# Páginas sem grade de tabela: o modo lattice não encontra nada nelas
+SEM_GRADE = (3, 4)
+# Intervalos de páginas pedidos ao Tabula
+CALLS = []
+
+
+def _pages(pages):
+    """Páginas de uma especificação do Tabula como "1-3,5"."""
+    out = []
+    for part in pages.split(","):
+        start, _, end = part.partition("-")
+        out.extend(range(int(start), int(end or start) + 1))
+    return out
+
+
+def _fake_read_pdf(path, pages, lattice=False, stream=False, output_format=None, **kwargs):
+    """Saída JSON do tabula-java: uma tabela por página, com o número da página."""
+    assert output_format == "json"
+    CALLS.append(pages)
+    modo = "lattice" if lattice else "stream"
+    rows = [["Código", "Procedimento", "OD", "AMB"], ["{p:08d}", "PROC {p} ({modo})", "OD", "AMB"]]
+    return [
+        {"page_number": p, "data": [[{"text": t.format(p=p, modo=modo)} for t in row] for row in rows]}
+        for p in _pages(pages)
+        if not (lattice and p in SEM_GRADE)
+    ]
+
+
+def _write_pdf(path, texts):
+    """PDF com uma página por texto; cada página tem seu próprio conteúdo."""
+    writer = PdfWriter()
+    for text in texts:
+        page = writer.add_blank_page(width=200, height=200)
+        content = StreamObject()
+        content.set_data(f"BT /F1 12 Tf 10 10 Td ({text}) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+
+@pytest.fixture
+def rol(monkeypatch):
+    """O módulo de extração com um `tabula` falso (tabula-py/Java não são necessários)."""
+    stub = types.ModuleType("tabula")
+    stub.read_pdf = _fake_read_pdf
+    monkeypatch.setitem(sys.modules, "tabula", stub)
+    module = importlib.import_module("etl.transform.extract_rol_anexo_I")
+    monkeypatch.setattr(module, "tabula", stub)
+    return module
+
+
+@pytest.fixture
+def pdf_path(rol, tmp_path):
+    CALLS.clear()
+    return _write_pdf(tmp_path / "Anexo_I_Rol_Procedimentos.pdf", [f"pagina {p}" for p in range(1, N_PAGES + 1)])
+
+
+def test_page_chunks_cover_every_page_in_order(rol):
+    assert rol._page_chunks(7, 3) == [(1, 3), (4, 6), (7, 7)]
+    assert rol._page_chunks(2, 25) == [(1, 2)]
+
+
+def test_stream_fallback_is_per_chunk(rol, pdf_path):
+    tables = rol.extrair_tabelas_brutas(PdfDocument(pdf_path), workers=1, pages_per_chunk=2)
+
+    procs = [t["Procedimento"].iloc[0] for t in tables]
+    assert len(procs) == N_PAGES
+    assert procs[2:4] == ["PROC 3 (stream)", "PROC 4 (stream)"]
+    assert all("(lattice)" in p for p in procs[:2] + procs[4:])
+
+
+def test_parallel_extraction_matches_serial(rol, pdf_path):
+    serial = rol.extrair_tabela_anexo_i(pdf_path, workers=1, pages_per_chunk=2)
+    parallel = rol.extrair_tabela_anexo_i(pdf_path, workers=3, pages_per_chunk=2)
+
+    pd.testing.assert_frame_equal(serial, parallel)
+    # Como no read_pdf do tabula-py, colunas só com números viram numéricas
+    assert serial["codigo"].tolist() == list(range(1, N_PAGES + 1))
+
+
+def _extrair(rol, pdf_path, **kwargs):
+    CALLS.clear()
+    return rol.extrair_tabela_anexo_i(pdf_path, workers=1, **kwargs)
+
+
+def test_page_cache_matches_uncached_extraction(rol, pdf_path, tmp_path):
+    cache_dir = tmp_path / "cache"
+    for pages_per_chunk in (None, 2, 3):
+        cached = _extrair(rol, pdf_path, pages_per_chunk=pages_per_chunk, cache_dir=cache_dir)
+        pd.testing.assert_frame_equal(cached, _extrair(rol, pdf_path, pages_per_chunk=pages_per_chunk))
+
+    # Padrão (um bloco com tabelas lattice): as páginas sem grade não passam pelo modo stream
+    default = _extrair(rol, pdf_path, cache_dir=cache_dir)
+    assert CALLS == []
+    assert default["codigo"].tolist() == [1, 2, 5, 6, 7]
+
+
+def test_page_cache_only_extracts_new_or_changed_pages(rol, pdf_path, tmp_path):
+    cache_dir = tmp_path / "cache"
+    first = _extrair(rol, pdf_path, pages_per_chunk=2, cache_dir=cache_dir)
+    # Páginas ausentes em blocos; o bloco 3-4, sem nenhuma tabela lattice, é relido em modo stream
+    assert CALLS == ["1-2", "3-4", "5-6", "7-7", "3-4"]
+
+    pd.testing.assert_frame_equal(_extrair(rol, pdf_path, pages_per_chunk=2, cache_dir=cache_dir), first)
+    assert CALLS == []
+
+    # Emenda: só as páginas 3 e 5 mudaram de conteúdo; a página 3 precisa também do modo stream
+    _write_pdf(pdf_path, [f"pagina {p}" if p not in (3, 5) else f"pagina {p} alterada" for p in range(1, N_PAGES + 1)])
+    _extrair(rol, pdf_path, pages_per_chunk=2, cache_dir=cache_dir)
+    assert CALLS == ["3-3", "5-5", "3-3"]
+
+
+def test_tables_are_built_from_tabula_json(rol):
+    cell = lambda t: {"text": t}
+    raw = [
+        {"page_number": 1, "data": [[cell("Código"), cell(""), cell("OD"), cell("OD")], [cell("10"), cell("x"), cell(""), cell("AMB")]]},
+        {"page_number": 1, "data": []},
+    ]
+
+    [df] = rol._tabelas_do_json(raw)
+    assert list(df.columns) == ["Código", "Unnamed: 0", "OD", "OD.1"]
+    assert df["Código"].tolist() == [10] and df["OD"].isna().all() and df["OD.1"].tolist() == ["AMB"]
+
+
+def test_batched_post_processing_matches_per_table_cleanup(rol):
+    legenda = {"OD": "Odontológico", "AMB": "Ambulatorial"}
+    tables = [
+        pd.DataFrame({"Código": ["1"], "Descrição": ["A"], "OD": ["OD"], "AMB": [None]}),
+        pd.DataFrame({"Código": [None, "2"], "Descrição": [None, "B"], "OD": [None, ""], "AMB": [None, "AMB"]}),
+        pd.DataFrame(),
+        pd.DataFrame({"Código": ["3", "1"], "PROCEDIMENTO": ["C", "A"]}),
+        pd.DataFrame({"Código ": [4], "Descrição": ["D"], "OD": [1], "AMB": ["Ambulatorial"]}),
+        pd.DataFrame({"Código": ["1"], "Descrição": ["A"], "OD": ["OD"], "AMB": [None]}),
+    ]
+
+    esperado = []
+    for table in tables:
+        if table.empty:
+            continue
+        df = rol.limpar_e_padronizar_colunas(table.dropna(how="all"))
+        esperado.append(replace_od_amb_values(df, legenda))
+    esperado = pd.concat(esperado, ignore_index=True).drop_duplicates().reset_index(drop=True)
+
+    df = rol.pos_processar_tabelas(tables, legenda)
+
+    assert df["od"].dtype == "category" and df["amb"].dtype == "category"
+    assert df.to_csv(index=False) == esperado.to_csv(index=False)
+    assert df["od"].tolist()[:2] == ["Odontológico", ""]
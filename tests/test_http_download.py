@@ -0,0 +1,224 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from etl.scraping.http_download import (
+    PART_SUFFIX,
+    HttpCache,
+    RemoteMeta,
+    _save_meta,
+    download_if_modified,
+    download_many,
+    download_resumable,
+)
+
+
+class _FakeServer:
+    """Servidor HTTP local com ETag, Range/If-Range e opção de derrubar a conexão."""
+
+    def __init__(self):
+        self.files = {}  # caminho -> (conteúdo, etag)
+        self.requests = []  # (método, caminho, Range)
+        self.cut_after = None  # encerra a próxima resposta após N bytes
+        self.send_length = True  # False: respostas sem Content-Length (corpo até fechar a conexão)
+        self.delay = 0.0
+        self.not_modified = 0
+        self.inflight = self.max_inflight = 0
+        self._lock = threading.Lock()
+
+    def handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _headers(self, status, body, etag, extra=None):
+                self.send_response(status)
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", "Mon, 01 Jan 2024 00:00:00 GMT")
+                self.send_header("Accept-Ranges", "bytes")
+                if server.send_length:
+                    self.send_header("Content-Length", str(len(body)))
+                for k, v in (extra or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+
+            def do_HEAD(self):
+                server.requests.append(("HEAD", self.path, None))
+                if self.path not in server.files:
+                    self.send_error(404)
+                    return
+                content, etag = server.files[self.path]
+                self._headers(200, content, etag)
+
+            def do_GET(self):
+                rng = self.headers.get("Range")
+                server.requests.append(("GET", self.path, rng))
+                content, etag = server.files[self.path]
+                if self.headers.get("If-None-Match") == etag:
+                    server.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                with server._lock:
+                    server.inflight += 1
+                    server.max_inflight = max(server.max_inflight, server.inflight)
+                time.sleep(server.delay)
+                with server._lock:
+                    server.inflight -= 1
+
+                if rng and self.headers.get("If-Range") in (None, etag):
+                    start = int(rng.split("=")[1].rstrip("-"))
+                    if start >= len(content):
+                        self._headers(416, b"", etag, {"Content-Range": f"bytes */{len(content)}"})
+                        return
+                    body = content[start:]
+                    self._headers(206, body, etag, {"Content-Range": f"bytes {start}-{len(content) - 1}/{len(content)}"})
+                    self.wfile.write(body)
+                    return
+
+                self._headers(200, content, etag)
+                if server.cut_after is not None:
+                    self.wfile.write(content[: server.cut_after])
+                    server.cut_after = None
+                    self.close_connection = True
+                    return
+                self.wfile.write(content)
+
+        return Handler
+
+
+@pytest.fixture
+def server():
+    fake = _FakeServer()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), fake.handler())
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    fake.base = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield fake
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_downloads_concurrently_and_skips_unchanged_files(server, tmp_path):
+    for i in range(4):
+        server.files[f"/{i}T2024.zip"] = (bytes([i]) * 50_000, f'"v{i}"')
+    server.delay = 0.2
+    jobs = [(f"{server.base}/{i}T2024.zip", tmp_path / f"{i}T2024.zip") for i in range(4)]
+
+    results = download_many(jobs, workers=4, log=lambda _: None)
+
+    assert [r.status for r in results] == ["baixado"] * 4
+    assert server.max_inflight > 1
+    assert all(dest.read_bytes() == bytes([i]) * 50_000 for i, (_, dest) in enumerate(jobs))
+    assert not list(tmp_path.glob(f"*{PART_SUFFIX}"))
+
+    server.requests.clear()
+    assert [r.status for r in download_many(jobs, workers=4, log=lambda _: None)] == ["inalterado"] * 4
+    assert {method for method, _, _ in server.requests} == {"HEAD"}
+
+
+def test_interrupted_download_resumes_with_range(server, tmp_path):
+    content = bytes(range(256)) * 16_000
+    server.files["/a.zip"] = (content, '"v1"')
+    dest = tmp_path / "a.zip"
+
+    server.cut_after = 3_000_000
+    with pytest.raises(Exception):
+        download_resumable(f"{server.base}/a.zip", dest, chunk_size=64 * 1024)
+    assert not dest.exists()
+    # Os blocos completos recebidos antes da queda ficam no .part
+    kept = (tmp_path / f"a.zip{PART_SUFFIX}").stat().st_size
+    assert 0 < kept <= 3_000_000
+
+    result = download_resumable(f"{server.base}/a.zip", dest)
+    assert result.status == "retomado"
+    assert result.bytes_transferidos == len(content) - kept
+    assert server.requests[-1] == ("GET", "/a.zip", f"bytes={kept}-")
+    assert dest.read_bytes() == content
+
+
+def test_partial_file_from_another_remote_version_is_discarded(server, tmp_path):
+    server.files["/a.zip"] = (b"novo" * 1000, '"v2"')
+    dest = tmp_path / "a.zip"
+    part = tmp_path / f"a.zip{PART_SUFFIX}"
+    part.write_bytes(b"antigo")
+    _save_meta(part, RemoteMeta(etag='"v1"', content_length=4000))
+
+    assert download_resumable(f"{server.base}/a.zip", dest).status == "baixado"
+    assert server.requests[-1] == ("GET", "/a.zip", None)
+    assert dest.read_bytes() == b"novo" * 1000
+
+
+def test_stale_or_truncated_final_file_is_downloaded_again(server, tmp_path):
+    server.files["/a.zip"] = (b"x" * 1000, '"v1"')
+    dest = tmp_path / "a.zip"
+    dest.write_bytes(b"x" * 10)  # arquivo meio gravado por uma versão antiga do script
+
+    assert download_resumable(f"{server.base}/a.zip", dest).status == "baixado"
+    assert dest.read_bytes() == b"x" * 1000
+
+    server.files["/a.zip"] = (b"y" * 1000, '"v2"')
+    assert download_resumable(f"{server.base}/a.zip", dest).status == "baixado"
+    assert dest.read_bytes() == b"y" * 1000
+
+
+def test_conditional_get_reuses_local_copy_on_304(server, tmp_path):
+    server.files["/relatorio_cadop.csv"] = (b"Registro_ANS;CNPJ\n1;2\n", '"c1"')
+    dest = tmp_path / "relatorio_cadop.csv"
+    url = f"{server.base}/relatorio_cadop.csv"
+
+    assert download_if_modified(url, dest).status == "baixado"
+    assert download_if_modified(url, dest).status == "inalterado"
+    assert server.not_modified == 1
+
+    server.files["/relatorio_cadop.csv"] = (b"Registro_ANS;CNPJ\n3;4\n", '"c2"')
+    assert download_if_modified(url, dest).status == "baixado"
+    assert dest.read_bytes().endswith(b"3;4\n")
+
+
+def test_listing_cache_skips_parsing_on_304(server, tmp_path):
+    server.files["/2024/"] = (b'<a href="1T2024.zip">1T2024.zip</a>', '"l1"')
+    url = f"{server.base}/2024/"
+    parsed = []
+
+    def parse(html):
+        parsed.append(html)
+        return ["1T2024.zip"]
+
+    session = requests.Session()
+    assert HttpCache(tmp_path / "cache.json").get(session, url, parse) == ["1T2024.zip"]
+    # Nova instância (nova execução do script): o cache persiste em disco
+    assert HttpCache(tmp_path / "cache.json").get(session, url, parse) == ["1T2024.zip"]
+    assert len(parsed) == 1
+    assert server.not_modified == 1
+
+
+def test_partial_file_longer_than_remote_is_discarded_on_416(server, tmp_path):
+    # Servidor trocou o arquivo por um menor mantendo o mesmo ETag
+    server.files["/a.zip"] = (b"z" * 1000, '"v1"')
+    dest = tmp_path / "a.zip"
+    part = tmp_path / f"a.zip{PART_SUFFIX}"
+    part.write_bytes(b"x" * 1500)
+    _save_meta(part, RemoteMeta(etag='"v1"'))
+
+    assert download_resumable(f"{server.base}/a.zip", dest).status == "baixado"
+    assert [rng for method, _, rng in server.requests if method == "GET"] == ["bytes=1500-", None]
+    assert dest.read_bytes() == b"z" * 1000
+    assert not part.exists()
+
+
+def test_body_without_length_is_not_finalized(server, tmp_path):
+    server.files["/a.zip"] = (b"z" * 1000, '"v1"')
+    server.send_length = False
+    server.cut_after = 400
+    dest = tmp_path / "a.zip"
+
+    with pytest.raises(IOError):
+        download_resumable(f"{server.base}/a.zip", dest)
+    assert not dest.exists()
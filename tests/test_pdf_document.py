@@ -0,0 +1,48 @@
+from pypdf import PdfWriter
+from pypdf.generic import DictionaryObject, NameObject, StreamObject
+
+from etl.transform import pdf_document
+from etl.transform.map_abbreviations import extract_od_amb_legend
+from etl.transform.pdf_document import PdfDocument
+
+
+def _write_pdf(path, texts):
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for text in texts:
+        page = writer.add_blank_page(width=400, height=200)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font}),
+        })
+        content = StreamObject()
+        content.set_data(f"BT /F1 10 Tf 10 100 Td ({text}) Tj ET".encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(content)
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+
+def test_legend_and_hashes_share_one_parsed_document(tmp_path, monkeypatch):
+    pdf = _write_pdf(tmp_path / "anexo.pdf", ["Tabela", "Tabela", "Legenda: OD - Odontologico; AMB: Ambulatorial."])
+
+    opened = []
+    reader = pdf_document.PdfReader
+    monkeypatch.setattr(pdf_document, "PdfReader", lambda path: opened.append(path) or reader(path))
+
+    doc = PdfDocument(pdf)
+    assert extract_od_amb_legend(doc) == {"OD": "Odontologico", "AMB": "Ambulatorial"}
+    hashes = doc.page_hashes()
+
+    assert opened == [str(pdf)]
+    # Páginas com o mesmo conteúdo têm o mesmo hash, independente da posição
+    assert hashes[0] == hashes[1] != hashes[2]
+    assert doc.page_text(-1) is doc.page_text(2)
+
+
+def test_legend_falls_back_when_missing(tmp_path):
+    pdf = _write_pdf(tmp_path / "anexo.pdf", ["Sem legenda"])
+    assert extract_od_amb_legend(str(pdf)) == {"OD": "Odontológico", "AMB": "Ambulatorial"}
@@ -0,0 +1,222 @@
+import zipfile
+
+import pandas as pd
+import pytest
+
+from etl.transform import prepare_demonstracoes_contabeis as prep
+from etl.transform.prepare_demonstracoes_contabeis import CsvSource, Periodo
+
+HEADER = '"DATA";"REG_ANS";"CD_CONTA_CONTABIL";"DESCRICAO";"VL_SALDO_INICIAL";"VL_SALDO_FINAL"'
+
+
+def _demo_csv(ano, trimestre, rows):
+    lines = [HEADER]
+    for reg_ans, conta, descricao, ini, fim in rows:
+        lines.append(f'"{ano}-{trimestre * 3:02d}-01";"{reg_ans}";"{conta}";"{descricao}";"{ini}";"{fim}"')
+    return "\n".join(lines) + "\n"
+
+
+@pytest.fixture
+def extracted(tmp_path):
+    """Três trimestres extraídos + um CSV que não é de demonstrações."""
+    out = []
+    for ano, tri in [(2024, 1), (2024, 2), (2024, 3)]:
+        folder = tmp_path / str(ano) / f"{tri}T"
+        folder.mkdir(parents=True)
+        rows = [
+            ("326305", "411", "EVENTOS/ SINISTROS CONHECIDOS OU AVISADOS", "0,00", f"{tri}.000,50"),
+            ("005711", "411", "EVENTOS/ SINISTROS CONHECIDOS OU AVISADOS", "0,00", f"{tri * 2},25"),
+            ("005711", "31", "CONTRAPRESTAÇÕES EFETIVAS", "0,00", "10,00"),
+        ]
+        (folder / f"{tri}T{ano}.csv").write_text(_demo_csv(ano, tri, rows), encoding="latin1")
+        out.append((folder, Periodo(ano=ano, trimestre=tri)))
+
+    (tmp_path / "2024" / "1T" / "dicionario.csv").write_text("campo;tipo\nREG_ANS;texto\n", encoding="utf-8")
+    return out
+
+
+def test_consolidate_normalizes_schema_and_audits(extracted):
+    df, audit = prep.consolidate_demonstracoes(extracted, workers=1)
+
+    assert list(df.columns) == [
+        "ano", "trimestre", "reg_ans", "cd_conta_contabil", "descricao_conta", "vl_saldo_inicial", "vl_saldo_final",
+    ]
+    assert len(df) == 9
+    assert set(zip(df["ano"], df["trimestre"])) == {("2024", "1"), ("2024", "2"), ("2024", "3")}
+    assert sorted(audit["status"].tolist()) == ["ok", "ok", "ok", "skipped_not_matching_schema"]
+
+
+def test_parallel_consolidation_matches_serial(extracted):
+    serial_df, serial_audit = prep.consolidate_demonstracoes(extracted, workers=1)
+    parallel_df, parallel_audit = prep.consolidate_demonstracoes(extracted, workers=3)
+
+    pd.testing.assert_frame_equal(serial_df, parallel_df)
+    pd.testing.assert_frame_equal(serial_audit, parallel_audit)
+
+
+def test_fast_reader_matches_legacy_reader(extracted):
+    folder, periodo = extracted[0]
+    source = CsvSource(folder / "1T2024.csv")
+
+    fast_df, info = prep._read_quarterly_csv(source)
+    legacy_df, legacy_enc = prep._try_read_csv(source)
+
+    assert info["leitura"] == "c_sniff"
+    assert (info["sep"], info["encoding"], info["colunas_raw"]) == (";", legacy_enc, legacy_df.shape[1])
+    # usecols descarta a coluna DATA, que o schema normalizado não usa
+    assert "DATA" not in fast_df.columns
+    pd.testing.assert_frame_equal(
+        prep._normalize_demonstracoes_schema(fast_df, periodo),
+        prep._normalize_demonstracoes_schema(legacy_df, periodo),
+    )
+
+
+def test_non_utf8_byte_after_sniff_sample_keeps_fast_reader(tmp_path):
+    # Início só ASCII (a amostra decodifica como UTF-8); o acento latin1 vem depois dela
+    rows = [("326305", "411", "EVENTOS", "1,00", "2,00")] * 3000 + [("005711", "311", "SAÚDE", "0,00", "1,00")]
+    path = tmp_path / "1T2024.csv"
+    path.write_bytes(_demo_csv(2024, 1, rows).encode("latin1"))
+    assert path.stat().st_size > prep.SNIFF_SAMPLE_BYTES
+
+    df, info = prep._read_quarterly_csv(CsvSource(path))
+
+    assert (info["leitura"], info["encoding"]) == ("c_sniff", "latin1")
+    assert df["DESCRICAO"].iloc[-1] == "SAÚDE" and len(df) == 3001
+
+
+def test_dialect_is_recorded_in_audit_and_falls_back_when_sniffing_fails(extracted):
+    folder, _ = extracted[0]
+    (folder / "sem_separador.csv").write_text("linha unica sem separador\n", encoding="utf-8")
+
+    _, audit = prep.consolidate_demonstracoes(extracted, workers=1)
+    by_name = audit.set_index(audit["arquivo"].str.rsplit("/", n=1).str[-1])
+
+    assert by_name.loc["1T2024.csv", "leitura"] == "c_sniff"
+    assert by_name.loc["1T2024.csv", "separador"] == ";"
+    assert by_name.loc["1T2024.csv", "aspas"] == '"'
+    assert by_name.loc["sem_separador.csv", "leitura"] == "python_fallback"
+
+
+@pytest.fixture
+def zips_root(tmp_path, extracted, monkeypatch):
+    """Compacta cada trimestre extraído em um ZIP no layout do FTP (ano/NTAAAA.zip)."""
+    root = tmp_path / "zips"
+    for folder, periodo in extracted:
+        zip_path = root / str(periodo.ano) / f"{periodo.trimestre}T{periodo.ano}.zip"
+        zip_path.parent.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            for csv_path in sorted(folder.glob("*.csv")):
+                zf.write(csv_path, arcname=csv_path.name)
+
+    monkeypatch.setattr(prep, "ZIPS_ROOT", root)
+    monkeypatch.setattr(prep, "EXTRACTED_ROOT", tmp_path / "extracted")
+    interim = tmp_path / "interim"
+    monkeypatch.setattr(prep, "INTERIM_DIR", interim)
+    monkeypatch.setattr(prep, "OUT_CSV", interim / "consolidado.csv")
+    monkeypatch.setattr(prep, "OUT_VALIDATION_CSV", interim / "validacao.csv")
+    monkeypatch.setattr(prep, "OUT_PARQUET", interim / "consolidado.parquet")
+    monkeypatch.setattr(prep, "MANIFEST_PATH", interim / "manifest.json")
+    monkeypatch.setattr(prep, "QUARTERS_DIR", interim / "trimestres")
+    monkeypatch.setenv("ANS_DEMO_OUTPUT_FORMAT", "csv")
+    return root
+
+
+def test_streaming_zips_matches_extracted_consolidation(zips_root):
+    streamed_df, streamed_audit = prep.consolidate_demonstracoes(prep.collect_sources(stream=True), workers=1)
+    assert not (zips_root.parent / "extracted").exists()
+
+    extracted_df, extracted_audit = prep.consolidate_demonstracoes(prep.collect_sources(stream=False), workers=1)
+
+    pd.testing.assert_frame_equal(streamed_df, extracted_df)
+    # A auditoria continua sendo por membro do ZIP
+    assert streamed_audit["arquivo"].str.contains(r"\.zip!", regex=True).all()
+    pd.testing.assert_frame_equal(
+        streamed_audit.drop(columns="arquivo"), extracted_audit.drop(columns="arquivo"),
+    )
+
+
+def test_unchanged_zip_is_not_extracted_again(zips_root, capsys):
+    prep.extract_all_zips()
+    capsys.readouterr()
+
+    prep.extract_all_zips()
+    out = capsys.readouterr().out
+    assert "Extraindo" not in out
+    assert out.count("ZIP inalterado") == 3
+
+
+def _full_consolidation_csv(tmp_path):
+    df, _ = prep.consolidate_demonstracoes(prep.collect_sources(stream=True), workers=1)
+    out = tmp_path / "full.csv"
+    df.to_csv(out, index=False, encoding="utf-8-sig")
+    return out.read_bytes()
+
+
+def _add_zip(root, ano, tri, rows):
+    zip_path = root / str(ano) / f"{tri}T{ano}.zip"
+    zip_path.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr(f"{tri}T{ano}.csv", _demo_csv(ano, tri, rows).encode("latin1"))
+    return zip_path
+
+
+def test_incremental_consolidation_only_processes_new_or_changed_quarters(zips_root, tmp_path):
+    first = prep.consolidate_incremental(stream=True, workers=1)
+    assert first["reprocessados"] == ["2024_1T", "2024_2T", "2024_3T"]
+    assert prep.OUT_CSV.read_bytes() == _full_consolidation_csv(tmp_path)
+
+    assert prep.consolidate_incremental(stream=True, workers=1)["reprocessados"] == []
+
+    # Novo trimestre: só ele é processado e anexado ao CSV consolidado
+    _add_zip(zips_root, 2024, 4, [("326305", "411", "EVENTOS", "0,00", "9,99")])
+    third = prep.consolidate_incremental(stream=True, workers=1)
+    assert third["reprocessados"] == ["2024_4T"]
+    assert third["linhas_novas"] == 1
+    assert prep.OUT_CSV.read_bytes() == _full_consolidation_csv(tmp_path)
+
+    # Trimestre histórico republicado: o CSV é regerado a partir das saídas por trimestre
+    _add_zip(zips_root, 2024, 2, [("005711", "411", "EVENTOS", "0,00", "1,00")])
+    fourth = prep.consolidate_incremental(stream=True, workers=1)
+    assert fourth["reprocessados"] == ["2024_2T"]
+    assert prep.OUT_CSV.read_bytes() == _full_consolidation_csv(tmp_path)
+
+    audit = pd.read_csv(prep.OUT_VALIDATION_CSV)
+    assert sorted(set(zip(audit["ano"], audit["trimestre"]))) == [(2024, 1), (2024, 2), (2024, 3), (2024, 4)]
+
+
+def test_full_csv_without_manifest_is_rewritten_not_appended(zips_root, tmp_path):
+    # CSV de uma execução completa (ANS_INCREMENTAL=0), ainda sem manifesto
+    prep.OUT_CSV.parent.mkdir(parents=True, exist_ok=True)
+    prep.OUT_CSV.write_bytes(_full_consolidation_csv(tmp_path))
+
+    prep.consolidate_incremental(stream=True, workers=1)
+    assert prep.OUT_CSV.read_bytes() == _full_consolidation_csv(tmp_path)
+
+
+def test_each_output_format_catches_up_with_quarters_added_in_other_format(zips_root, tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    from etl.transform.to_parquet import read_parquet_dataset
+
+    prep.consolidate_incremental(stream=True, workers=1)
+
+    # Trimestre novo numa execução só de Parquet
+    monkeypatch.setenv("ANS_DEMO_OUTPUT_FORMAT", "parquet")
+    _add_zip(zips_root, 2024, 4, [("326305", "411", "EVENTOS", "0,00", "9,99")])
+    prep.consolidate_incremental(stream=True, workers=1)
+
+    # A execução seguinte em CSV precisa incluir o 4º trimestre
+    monkeypatch.setenv("ANS_DEMO_OUTPUT_FORMAT", "csv")
+    assert prep.consolidate_incremental(stream=True, workers=1)["reprocessados"] == []
+    assert prep.OUT_CSV.read_bytes() == _full_consolidation_csv(tmp_path)
+
+    # E o inverso: trimestre republicado só no CSV chega ao Parquet depois
+    _add_zip(zips_root, 2024, 2, [("005711", "411", "EVENTOS", "0,00", "1,00")])
+    prep.consolidate_incremental(stream=True, workers=1)
+    monkeypatch.setenv("ANS_DEMO_OUTPUT_FORMAT", "parquet")
+    prep.consolidate_incremental(stream=True, workers=1)
+
+    full, _ = prep.consolidate_demonstracoes(prep.collect_sources(stream=True), workers=1)
+    parquet = read_parquet_dataset(prep.OUT_PARQUET, columns=["ano", "trimestre", "reg_ans"])
+    assert sorted(zip(parquet["ano"], parquet["trimestre"], parquet["reg_ans"].astype(str))) == sorted(
+        zip(full["ano"].astype(int), full["trimestre"].astype(int), full["reg_ans"])
+    )
@@ -0,0 +1,96 @@
+import os
+
+import pandas as pd
+import pytest
+
+from api.ranking_service import RankingService
+
+
+def _write_csv(path, rows):
+    lines = ["reg_ans,descricao_norm,vl_saldo_final_num"]
+    lines += [f"{r},{d},{v}" for r, d, v in rows]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8-sig")
+
+
+def test_top_is_served_from_memory_until_file_changes(tmp_path):
+    csv_path = tmp_path / "demo.csv"
+    _write_csv(csv_path, [("000001", "A", 10), ("000002", "B", 30), ("000001", "A", 5)])
+
+    service = RankingService(csv_path=str(csv_path))
+    assert service.refresh() is True
+    assert service.refresh() is False
+
+    top = service.top(10)
+    assert [r["reg_ans"] for r in top] == ["000002", "000001"]
+    assert top[1]["valor_real"] == 15
+    assert len(service.top(1)) == 1
+
+    _write_csv(csv_path, [("000003", "C", 99), ("000002", "B", 30)])
+    st = csv_path.stat()
+    os.utime(csv_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    # top() só fatia o ranking carregado; a recarga é explícita
+    assert [r["reg_ans"] for r in service.top(10)] == ["000002", "000001"]
+    assert service.refresh() is True
+    assert [r["reg_ans"] for r in service.top(10)] == ["000003", "000002"]
+
+
+def test_missing_file_returns_empty_ranking(tmp_path):
+    service = RankingService(csv_path=str(tmp_path / "nao_existe.csv"))
+    service.refresh()
+    assert service.top(10) == []
+
+
+def test_parquet_dataset_is_preferred_over_csv(tmp_path):
+    pytest.importorskip("pyarrow")
+    from etl.transform.to_parquet import read_parquet_dataset, save_parquet_dataset
+
+    csv_path = tmp_path / "demo.csv"
+    _write_csv(csv_path, [("000001", "A", 1)])
+
+    df = pd.DataFrame({
+        "ano": ["2024", "2024", "2025"],
+        "trimestre": ["3", "4", "1"],
+        "reg_ans": ["000001", "000002", "000002"],
+        "descricao_norm": ["A", "B", "B"],
+        "vl_saldo_final": ["1.000,50", "2,5", None],
+        "vl_saldo_final_num": [1000.5, 2.5, 7.0],
+    })
+    save_parquet_dataset(df, csv_path.with_suffix(".parquet"))
+
+    part = read_parquet_dataset(csv_path.with_suffix(".parquet"), periods=[(2024, 3)])
+    assert part["reg_ans"].astype(str).tolist() == ["000001"]
+    assert part["vl_saldo_final"].tolist() == [1000.5]
+    assert part["ano"].dtype == "int16"
+
+    service = RankingService(csv_path=str(csv_path))
+    service.refresh()
+    assert [(r["reg_ans"], r["valor_real"]) for r in service.top(10)] == [("000001", 1000.5), ("000002", 9.5)]
+
+
+def test_csv_and_parquet_sources_produce_identical_payloads(tmp_path):
+    pytest.importorskip("pyarrow")
+    from etl.transform.to_parquet import save_parquet_dataset
+
+    rows = [("000001", "A", 10.0), ("000002", "B", 30.0), ("000001", "A", 5.0), ("012345", "C", 1.0)]
+    csv_path = tmp_path / "demo.csv"
+    _write_csv(csv_path, rows)
+    save_parquet_dataset(
+        pd.DataFrame({
+            "ano": "2024", "trimestre": "1",
+            "reg_ans": [r for r, _, _ in rows],
+            "descricao_norm": [d for _, d, _ in rows],
+            "vl_saldo_final": None,
+            "vl_saldo_final_num": [v for _, _, v in rows],
+        }),
+        tmp_path / "demo.parquet",
+    )
+
+    from_parquet = RankingService(csv_path=str(csv_path))
+    from_csv = RankingService(csv_path=str(csv_path), parquet_path=str(tmp_path / "sem_parquet"))
+    from_parquet.refresh()
+    from_csv.refresh()
+
+    assert from_parquet._use_parquet() and not from_csv._use_parquet()
+    assert from_csv.top(10) == from_parquet.top(10)
+    assert [r["reg_ans"] for r in from_csv.top(10)] == ["000002", "000001", "012345"]
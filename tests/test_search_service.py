@@ -0,0 +1,129 @@
+import pytest
+
+from api.search_service import SEARCH_FIELDS, OperadorasSearchService, _normalize_text, _substring_distance
+from conftest import CADOP_ROWS
+
+@pytest.fixture
+def service(cadop_csv):
+    s = OperadorasSearchService(csv_path=str(cadop_csv))
+    s.load()
+    return s
+
+
+def _linear_search(service, query, limit=50):
+    """Referência: varredura linear de todos os registros, score pela soma dos pesos dos campos."""
+    q = _normalize_text(query)
+    index = service.index
+    hits = []
+    for i in range(len(index)):
+        score = sum(weight for field, weight in SEARCH_FIELDS if q in index._normalized[field][i])
+        if score > 0:
+            hits.append({"score": score, **index._item(i)})
+    hits.sort(key=lambda h: h["score"], reverse=True)
+    return hits[:limit]
+
+
+def test_load_maps_cadop_columns(service):
+    assert len(service) == len(CADOP_ROWS)
+    first = service.index._item(0)
+    assert first["registro_ans"] == "326305"
+    assert first["razao_social"] == "AMIL ASSISTÊNCIA MÉDICA INTERNACIONAL S.A."
+    assert first["modalidade"] == "Medicina de Grupo"
+
+
+@pytest.mark.parametrize("query", ["amil", "saude", "Bradesco Saúde", "0057", "1182", "sa", "s", "sao", "zzzz", "  unimed   belo "])
+def test_indexed_search_matches_linear_scan(service, query):
+    assert service.search(query) == _linear_search(service, query)
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 50])
+@pytest.mark.parametrize("query", ["s", "a", "sa", "saude", "medic", "0"])
+def test_top_k_selection_matches_full_sort(service, query, limit):
+    # Empates de score mantêm a ordem do catálogo, como no sort estável
+    assert service.search(query, limit=limit) == _linear_search(service, query, limit=limit)
+
+
+def test_search_scores_use_field_weights(service):
+    results = service.search("326305")
+    assert results[0]["registro_ans"] == "326305"
+    assert results[0]["score"] == 10
+
+    results = service.search("bradesco saude")
+    assert results[0]["score"] == 5 + 4
+
+
+def test_suggest_prefers_field_starts_then_word_starts(service):
+    # "Unimed-BH" começa com "uni"; nenhuma outra razão/fantasia começa assim
+    assert [r["registro_ans"] for r in service.suggest("uni")] == ["343889"]
+
+    # Início de palavra: "saude" no meio de "bradesco saude" e "sao francisco saude"
+    results = service.suggest("saude")
+    assert {r["razao_social"] for r in results} == {"BRADESCO SAÚDE S.A.", "SÃO FRANCISCO SAÚDE"}
+
+    assert service.suggest("bra")[0]["campo"] in {"nome_fantasia", "razao_social"}
+    assert service.suggest("bradesco", limit=1)[0]["cnpj"] == "92693118000160"
+
+
+def test_suggest_matches_cnpj_digits_and_respects_limit(service):
+    assert [r["registro_ans"] for r in service.suggest("29.309.127/0001")] == ["326305"]
+    assert service.suggest("29309")[0]["campo"] == "cnpj"
+    assert len(service.suggest("s", limit=1)) == 1
+    assert service.suggest("zzz") == []
+
+
+def _levenshtein_substring(pattern, text):
+    prev = [0] * (len(text) + 1)
+    for i, a in enumerate(pattern, 1):
+        cur = [i] + [0] * len(text)
+        for j, b in enumerate(text, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (a != b))
+        prev = cur
+    return min(prev)
+
+
+@pytest.mark.parametrize("pattern,text", [
+    ("unimde", "unimed belo horizonte"), ("bradsco", "bradesco saude"), ("abc", ""),
+    ("odontoprve", "odontoprev s.a."), ("saude", "sao francisco saude"), ("xyz", "abc"),
+])
+def test_substring_distance_matches_dynamic_programming(pattern, text):
+    assert _substring_distance(pattern, text) == _levenshtein_substring(pattern, text)
+
+
+def test_fuzzy_search_tolerates_typos(service):
+    assert service.search("unimde") == []
+    top = service.search_fuzzy("unimde")[0]
+    assert (top["nome_fantasia"], top["distancia"]) == ("UNIMED-BH", 1)
+
+    results = service.search_fuzzy("bradsco saude")
+    assert results[0]["cnpj"] == "92693118000160"
+
+    # Acerto exato pontua mais que aproximado
+    exact = service.search_fuzzy("amil")[0]
+    assert (exact["registro_ans"], exact["distancia"]) == ("326305", 0)
+    assert service.search_fuzzy("zzzzzz") == []
+
+
+def _append_row(path, row):
+    with open(path, "ab") as f:
+        f.write((";".join(row) + ";" * 14 + "\n").encode("latin1"))
+
+
+def test_reload_swaps_index_only_when_csv_changes(service, cadop_csv):
+    old = service.index
+    assert service.version == 1 and old.load_seconds >= 0
+    assert service.reload_if_changed() is False and service.index is old
+
+    _append_row(cadop_csv, ("421545", "11111111000111", "HAPVIDA ASSISTÊNCIA MÉDICA", "HAPVIDA", "Medicina de Grupo"))
+    assert service.reload_if_changed() is True
+    assert service.version == 2 and len(service) == len(CADOP_ROWS) + 1
+    assert service.search("hapvida")[0]["registro_ans"] == "421545"
+
+    # Quem ainda segura o índice anterior continua com os dados antigos
+    assert len(old) == len(CADOP_ROWS) and old.search("hapvida") == []
+
+
+def test_failed_reload_keeps_current_index(service, cadop_csv, monkeypatch):
+    current = service.index
+    monkeypatch.setattr(service, "_read_records", lambda: 1 / 0)
+    assert service.load() is False
+    assert service.index is current and service.search("amil")